@@ -1,3 +1,11 @@
-__all__ = ["query_by_subgraphs", "extract_requirement_triples"]
-from chat.query import query_by_subgraphs
+__all__ = [
+    "query_by_subgraphs",
+    "stream_query_by_subgraphs",
+    "extract_requirement_triples",
+    "get_embeddings",
+    "get_llm",
+]
+from chat.embedding import get_embeddings
+from chat.llm import get_llm
+from chat.query import query_by_subgraphs, stream_query_by_subgraphs
 from chat.triple import extract_requirement_triples
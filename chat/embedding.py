@@ -0,0 +1,56 @@
+import logging
+import os
+from functools import lru_cache
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("embedding")
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> Optional[Embeddings]:
+    """
+    根据环境变量 EMBEDDING_MODEL 加载 HuggingFace 向量模型。
+    未设置时返回 None，实体检索退回全文索引 + Sørensen–Dice 相似度。
+    使用前需要额外安装 sentence-transformers。
+    模型只在首次调用时加载，之后的调用复用同一个实例。
+    - EMBEDDING_BACKEND: 推理后端，可选 torch（默认）、onnx、openvino
+    - EMBEDDING_MODEL_FILE: 后端为 onnx/openvino 时加载的模型文件，
+      例如 CPU 上使用 int8 量化的 onnx/model_qint8_avx512_vnni.onnx
+    - EMBEDDING_DTYPE: 后端为 torch 时的权重精度，例如 GPU 上使用 float16 或 bfloat16
+    - EMBEDDING_BATCH_SIZE: 导入三元组时批量编码实体名的批大小，默认 32
+    """
+    model_name = os.getenv("EMBEDDING_MODEL")
+    if not model_name:
+        return None
+
+    from chat.huggingface import BatchedHuggingFaceEmbeddings
+
+    model_kwargs: dict = {}
+    backend = os.getenv("EMBEDDING_BACKEND", "torch")
+    if backend != "torch":
+        model_kwargs["backend"] = backend
+        if model_file := os.getenv("EMBEDDING_MODEL_FILE"):
+            model_kwargs["model_kwargs"] = {"file_name": model_file}
+    elif dtype := os.getenv("EMBEDDING_DTYPE"):
+        # 半精度权重走 GPU 的 tensor core，显存带宽减半；输出向量仍为 float 列表
+        model_kwargs["model_kwargs"] = {"torch_dtype": dtype}
+
+    encode_kwargs: dict = {"normalize_embeddings": True}
+    query_encode_kwargs: dict = {"normalize_embeddings": True}
+    if batch_size := os.getenv("EMBEDDING_BATCH_SIZE"):
+        # 导入时实体名一次性批量编码，GPU 上调大批次可以提高利用率
+        encode_kwargs["batch_size"] = int(batch_size)
+    if "e5" in model_name.lower():
+        # e5 系列模型要求为文档和查询分别加上 "passage: " / "query: " 前缀
+        encode_kwargs["prompt"] = "passage: "
+        query_encode_kwargs["prompt"] = "query: "
+
+    logger.info(f"🧠 正在加载向量模型: [bold]{model_name}[/bold]（后端: {backend}）")
+    return BatchedHuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs=encode_kwargs,
+        query_encode_kwargs=query_encode_kwargs,
+    )
@@ -0,0 +1,24 @@
+from langchain_core.runnables.config import run_in_executor
+from langchain_huggingface import HuggingFaceEmbeddings
+
+
+class BatchedHuggingFaceEmbeddings(HuggingFaceEmbeddings):
+    """
+    在 HuggingFaceEmbeddings 的基础上增加批量编码查询的接口。
+    embed_query 每次只编码一条文本，多个实体查询各自做一次分词和前向计算；
+    这里按 embed_query 相同的编码参数（例如 e5 的 "query: " 前缀）一次编码多条
+    """
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        # 与 embed_query 一致：配置了 query_encode_kwargs 时使用它，否则退回 encode_kwargs；
+        # 换行替换为空格，与文档编码的预处理相同
+        encode_kwargs = self.query_encode_kwargs or self.encode_kwargs
+        embeddings = self._client.encode(
+            [text.replace("\n", " ") for text in texts],
+            show_progress_bar=self.show_progress,
+            **encode_kwargs,
+        )
+        return embeddings.tolist()
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        return await run_in_executor(None, self.embed_queries, texts)
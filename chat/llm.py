@@ -0,0 +1,19 @@
+from functools import lru_cache
+from typing import Optional
+
+from langchain_litellm import ChatLiteLLM
+
+DEFAULT_MODEL = "deepseek/deepseek-chat"
+
+
+@lru_cache(maxsize=8)
+def get_llm(
+    model: str = DEFAULT_MODEL, temperature: Optional[float] = None
+) -> ChatLiteLLM:
+    """
+    按模型和温度缓存 ChatLiteLLM 实例，同一进程内的各个调用方共用同一个客户端，
+    不必在每次调用时重新构造
+    """
+    if temperature is None:
+        return ChatLiteLLM(model=model)
+    return ChatLiteLLM(model=model, temperature=temperature)
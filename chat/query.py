@@ -1,20 +1,22 @@
 import logging
-from typing import Optional
+import re
+from typing import AsyncIterator, Optional
 
-from langchain.prompts import PromptTemplate
 from langchain_litellm import ChatLiteLLM
-from rich.logging import RichHandler
 
-from chat.template import entity_prompt_template
+from chat.template import answer_prompt, entity_prompt
+from controller.cache import TTLCache, normalize_query
 from controller.graph import Neo4jGraphController
 
+# 作为库导入时不配置根日志，由 web.py / utils.py 等入口统一配置
 logger = logging.getLogger("query")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True, show_time=False, markup=True)],
-)
+
+# 实体之间的分隔符（兼容中文逗号、顿号）以及实体两端需要去除的空白、引号和标点
+_ENTITY_SEPARATOR = re.compile(r"[,，、]")
+_ENTITY_STRIP = re.compile(r"""^[\s'"‘’“”「」《》。.]+|[\s'"‘’“”「」《》。.]+$""")
+
+# 相同问题在 5 分钟内复用实体提取结果，避免重复调用 LLM
+_entity_cache: TTLCache[list[str]] = TTLCache(maxsize=1024, ttl=300)
 
 
 # --- 实体提取函数 ---
@@ -27,65 +29,148 @@ async def extract_entities(llm: ChatLiteLLM, question: str) -> list[str]:
         list: 提取到的实体列表
     例如：['比尔·盖茨', '苹果公司', '马斯克', '飞机']
     """
-    logger.info(f"🧠 正在提取实体: {question}")
+    cache_key = normalize_query(question)
+    cached = _entity_cache.get(cache_key)
+    if cached is not None:
+        logger.info("⚡ 命中实体缓存: %s", cached)
+        return list(cached)
 
-    entities_text_result = llm.invoke(
-        PromptTemplate(
-            input_variables=["question"], template=entity_prompt_template
-        ).format(question=question)
-    )
+    logger.info("🧠 正在提取实体: %s", question)
+
+    # 使用协程调用 LLM，等待响应期间不阻塞事件循环中的其他请求
+    entities_text_result = await llm.ainvoke(entity_prompt.format(question=question))
     entities_text = entities_text_result.content
 
     if not isinstance(entities_text, str):
         logger.error("❌ 实体提取结果不是字符串类型，请检查 LLM 响应格式。")
         return []
-    entities_text_list = entities_text.split(",")
     entities = [
-        e.strip().strip("'").strip('"') for e in entities_text_list if e.strip()
+        entity
+        for e in _ENTITY_SEPARATOR.split(entities_text)
+        if (entity := _ENTITY_STRIP.sub("", e))
+    ]
+    logger.info("✅ 提取到实体: %s", entities)
+    _entity_cache.set(cache_key, entities)
+    return list(entities)
+
+
+# --- 子图格式化 ---
+def format_subgraphs(subgraphs: list[dict[str, list[dict]]]) -> str:
+    """
+    将子图压缩为逐行文本，减少提示词中的重复内容：
+    - 关系写成 "起点 -[类型]-> 终点"
+    - 只列出带描述的节点，以及没有出现在任何关系中的孤立节点
+    """
+    edges: dict[tuple, None] = {}
+    nodes: dict[str, str] = {}
+    for subgraph in subgraphs:
+        for rel in subgraph.get("relationships", []):
+            edges[(rel["start"], rel["type"], rel["end"])] = None
+        for node in subgraph.get("nodes", []):
+            if node.get("name"):
+                nodes.setdefault(node["name"], node.get("description") or "")
+
+    linked = {name for start, _, end in edges for name in (start, end)}
+    node_lines = [
+        f"{name}: {description}" if description else name
+        for name, description in nodes.items()
+        if description or name not in linked
     ]
-    logger.info(f"✅ 提取到实体: {entities}")
-    return entities
+    edge_lines = [f"{start} -[{rel_type}]-> {end}" for start, rel_type, end in edges]
+    return "\n".join(["实体：", *node_lines, "关系：", *edge_lines])
 
 
 # --- 问题处理主流程 ---
-async def query_by_subgraphs(
+async def build_answer_prompt(
     llm: ChatLiteLLM,
     graph_controller: Neo4jGraphController,
     question: str,
     depth=2,
     limit=20,
 ) -> Optional[str]:
+    """
+    提取实体并查询子图，生成交给 LLM 作答的提示词；任一步没有结果时返回 None
+    """
     # 1. 提取实体
     entities = await extract_entities(llm=llm, question=question)
     if not entities:
         logger.warning("⚠️ 没有提取到实体，无法进行子图查询。")
         return None
 
-    # 2.与数据库中的实体进行检索
-    logger.info(f"🔍 查询实体: {entities}")
-    likely_entities = await graph_controller.search_likely_entities(entities)
+    # 2. 与数据库中的实体进行检索，并在同一次查询中展开子图
+    logger.info("🔍 查询实体: %s", entities)
+    likely_entities, subgraphs = await graph_controller.query_subgraph_by_entities(
+        entities, depth=depth, limit=limit
+    )
     if not likely_entities:
         logger.warning("⚠️ 没有找到匹配的实体，无法进行子图查询。")
         return None
-    logger.info(f"✅ 匹配到的实体: {likely_entities}")
+    logger.info("✅ 匹配到的实体: %s", likely_entities)
 
-    # 3. 查询子图
-    subgraphs = await graph_controller.query_subgraph(
-        likely_entities, depth=depth, limit=limit
-    )
+    # 3. 检查子图
     if not subgraphs:
         logger.warning("⚠️ 子图查询结果为空。")
         return None
-    logger.info(f"🌟 子图查询成功，结果数量: {len(subgraphs)}，内容为：{subgraphs}")
+    logger.info("🌟 子图查询成功，结果数量: %d", len(subgraphs))
+    logger.debug("子图内容: %s", subgraphs)
 
     # 4. 再次格式化问题
-    prompt = PromptTemplate(
-        input_variables=["question", "subgraph"],
-        template="请根据以下子图信息回答问题：\n\n{question}\n\n子图信息：{subgraph}",
+    prompt = answer_prompt.format(
+        question=question, subgraph=format_subgraphs(subgraphs)
+    )
+    logger.debug("📝 格式化后的问题: %s", prompt)
+    return prompt
+
+
+async def query_by_subgraphs(
+    llm: ChatLiteLLM,
+    graph_controller: Neo4jGraphController,
+    question: str,
+    depth=2,
+    limit=20,
+) -> Optional[str]:
+    prompt = await build_answer_prompt(
+        llm=llm,
+        graph_controller=graph_controller,
+        question=question,
+        depth=depth,
+        limit=limit,
     )
-    question = prompt.format(question=question, subgraph=subgraphs)
-    answer_result = llm.invoke(question)
+    if prompt is None:
+        return None
+    answer_result = await llm.ainvoke(prompt)
     answer = answer_result.content
-    logger.info(f"📝 格式化后的问题: {question}")
-    logger.info(f"💡 回答: {answer}")
+    logger.info("💡 回答: %s", answer)
     return str(answer)
+
+
+async def stream_query_by_subgraphs(
+    llm: ChatLiteLLM,
+    graph_controller: Neo4jGraphController,
+    question: str,
+    depth=2,
+    limit=20,
+) -> AsyncIterator[str]:
+    """
+    与 query_by_subgraphs 相同，但回答随 LLM 生成逐段产出，无需等待完整回答；
+    没有可用的子图时不产出任何内容
+    """
+    prompt = await build_answer_prompt(
+        llm=llm,
+        graph_controller=graph_controller,
+        question=question,
+        depth=depth,
+        limit=limit,
+    )
+    if prompt is None:
+        return
+    # 缓存完整回答只为记录日志，日志级别过滤掉时不保留已产出的片段
+    log_answer = logger.isEnabledFor(logging.INFO)
+    parts: list[str] = []
+    async for chunk in llm.astream(prompt):
+        if content := str(chunk.content):
+            if log_answer:
+                parts.append(content)
+            yield content
+    if log_answer:
+        logger.info("💡 回答: %s", "".join(parts))
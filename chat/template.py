@@ -1,3 +1,5 @@
+from langchain.prompts import PromptTemplate
+
 entity_prompt_template = (
     "请从以下问题中**只**提取所有实体，用**逗号**分隔，只输出实体列表，不要解释，不要加上任何其他内容。"
     "例如：'比尔·盖茨, 苹果公司, 马斯克, 飞机'。\n问题：{question}"
@@ -74,3 +76,16 @@ triple_prompt_template = (
     "- 请严格输出 JSON 格式，不要添加任何解释。\n"
     "- 所有文本均使用中文，字段名请保留英文。\n"
 )
+
+answer_prompt_template = "请根据以下子图信息回答问题：\n\n{question}\n\n子图信息：{subgraph}"
+
+# 模板在导入时构建一次，调用处直接 format，避免每次请求重复解析模板
+entity_prompt = PromptTemplate(
+    input_variables=["question"], template=entity_prompt_template
+)
+triple_prompt = PromptTemplate(
+    input_variables=["p1", "p2", "p3", "p4"], template=triple_prompt_template
+)
+answer_prompt = PromptTemplate(
+    input_variables=["question", "subgraph"], template=answer_prompt_template
+)
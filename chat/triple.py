@@ -1,27 +1,33 @@
 import asyncio
 import json
 import logging
-from typing import Any, Coroutine
+from typing import Awaitable, Iterable
 
-from langchain.prompts import PromptTemplate
+import orjson
 from langchain_litellm import ChatLiteLLM
 from rich.logging import RichHandler
 
-from chat.template import triple_prompt_template
+from chat.template import triple_prompt
 
+# 作为库导入时不配置根日志，由 web.py / utils.py 等入口统一配置；直接运行本模块时在 __main__ 中配置
 logger = logging.getLogger("triple_extractor")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True, show_time=False, markup=True)],
-)
 
 
 # --- 加载 txt 文件并分段 ---
-def split_paragraphs(content: str) -> list[str]:
-    paragraphs = [p.strip() for p in content.split("\n") if p.strip()]
-    return paragraphs
+def split_paragraphs(content: str | Iterable[str]) -> list[str]:
+    """
+    按行切分段落并去除空行，content 可以是整段文本，也可以是逐行迭代的文件对象
+    """
+    lines = content.split("\n") if isinstance(content, str) else content
+    return [paragraph for line in lines if (paragraph := line.strip())]
+
+
+def read_paragraphs(path: str) -> list[str]:
+    """
+    逐行读取文本文件并分段，避免先把整个文件读入内存
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return split_paragraphs(f)
 
 
 async def extract_triples_from_paragraphs(
@@ -31,43 +37,59 @@ async def extract_triples_from_paragraphs(
     p3: str,
     p4: str,
     logger: logging.Logger,
+    semaphore: asyncio.Semaphore,
 ) -> str:
     """
     使用 LLM 从四个段落中提取三元组。
     Args:
         p1, p2, p3, p4 (str): 四个段落文本
+        semaphore (asyncio.Semaphore): 限制同时进行的 LLM 请求数
     Returns:
         str: LLM 返回的 JSON 格式字符串
     """
-    prompt = PromptTemplate(
-        input_variables=["p1", "p2", "p3", "p4"], template=triple_prompt_template
-    ).format(p1=p1, p2=p2, p3=p3, p4=p4)
-    logger.info(f"🧠 正在处理段落：\n{p1}\n{p2}\n{p3}\n{p4}")
-    response = llm.invoke(prompt)
+    prompt = triple_prompt.format(p1=p1, p2=p2, p3=p3, p4=p4)
+    async with semaphore:
+        logger.info(
+            "🧠 正在处理段落，长度: %d/%d/%d/%d", len(p1), len(p2), len(p3), len(p4)
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("段落内容：\n%s\n%s\n%s\n%s", p1, p2, p3, p4)
+        # 遇到限流等错误时按指数退避重试
+        response = await llm.with_retry(
+            wait_exponential_jitter=True, stop_after_attempt=6
+        ).ainvoke(prompt)
     if not response.content:
         logger.error("❌ LLM 响应内容为空，请检查模型配置或输入段落。")
         return ""
     return str(response.content)
 
 
+async def _with_index(index: int, coro: Awaitable[str]) -> tuple[int, str]:
+    """
+    为 as_completed 返回的结果带上窗口序号
+    """
+    return index, await coro
+
+
 # --- 主流程（修改滑动窗口为4段，步长3） ---
 async def extract_requirement_triples(
     llm: ChatLiteLLM,
-    content: str,
+    content: str | Iterable[str],
     window_size=4,
     step=3,
+    max_concurrency=16,
 ) -> dict:
     """
     从输入文本中提取需求相关的三元组，并返回 JSON 。
     Args:
-        content (str): 输入文本文件内容
+        content (str | Iterable[str]): 输入文本文件内容，或逐行迭代的段落
         window_size (int): 窗口大小，默认为4段
         step (int): 步长，默认为3段
+        max_concurrency (int): 同时进行的 LLM 请求上限，默认为16
     """
     paragraphs = split_paragraphs(content)
-    output_triples = []
-
-    tasks: list[Coroutine[Any, Any, str]] = []
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks: list[asyncio.Task[tuple[int, str]]] = []
     total_windows = (len(paragraphs) - window_size) // step + 1
 
     for i in range(total_windows):
@@ -79,34 +101,51 @@ async def extract_requirement_triples(
             break
 
         tasks.append(
-            extract_triples_from_paragraphs(
-                llm=llm,
-                p1=window_paragraphs[0],
-                p2=window_paragraphs[1],
-                p3=window_paragraphs[2],
-                p4=window_paragraphs[3],
-                logger=logger,
+            asyncio.create_task(
+                _with_index(
+                    i,
+                    extract_triples_from_paragraphs(
+                        llm=llm,
+                        p1=window_paragraphs[0],
+                        p2=window_paragraphs[1],
+                        p3=window_paragraphs[2],
+                        p4=window_paragraphs[3],
+                        logger=logger,
+                        semaphore=semaphore,
+                    ),
+                )
             )
         )
 
-    results = await asyncio.gather(*tasks)
-
-    for i, result in enumerate(results):
+    # 每个窗口完成后立即解析，不必等待全部窗口返回；
+    # 结果按窗口序号存放，最后按窗口顺序合并，保证相同输入的输出顺序一致
+    window_triples: list[list] = [[] for _ in tasks]
+    for completed, future in enumerate(asyncio.as_completed(tasks), start=1):
+        index, result = await future
         try:
-            result_json = json.loads(result)
-        except json.JSONDecodeError:
-            logger.error(f"❌ JSON 解析失败：{result}")
+            result_json = orjson.loads(result)
+        except orjson.JSONDecodeError:
+            logger.error("❌ JSON 解析失败：%s", result)
             continue
 
-        triples = result_json.get("triples", [])  # 注意这里用 "triples"
-        output_triples.extend(triples)
-        logger.info(f"✅ 已处理窗口 {i + 1}/{total_windows}")
+        window_triples[index] = result_json.get("triples", [])  # 注意这里用 "triples"
+        logger.info(
+            "✅ 已完成 %d/%d 个窗口（第 %d 个窗口）", completed, total_windows, index + 1
+        )
 
-    logger.info(f"🎉 提取完成，共提取三元组数: {len(output_triples)}")
+    output_triples = [triple for triples in window_triples for triple in triples]
+    logger.info("🎉 提取完成，共提取三元组数: %d", len(output_triples))
     return {"triples": output_triples}
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(rich_tracebacks=True, show_time=False, markup=True)],
+    )
+
     # 测试代码
     test_content = (
         "系统应该允许用户登录。\n"
@@ -1,19 +1,30 @@
+import asyncio
 import logging
 import re
-from typing import LiteralString, Optional
+from collections import defaultdict
+from functools import lru_cache
+from typing import LiteralString, Optional, cast
 
-from neo4j import AsyncGraphDatabase, AsyncSession
+from langchain_core.embeddings import Embeddings
+from neo4j import AsyncGraphDatabase, AsyncSession, RoutingControl
 from rich.logging import RichHandler
 
+from controller.cache import TTLCache
+
+# 作为库导入时不配置根日志，由 web.py / utils.py 等入口统一配置；直接运行本模块时在 __main__ 中配置
 logger = logging.getLogger("graph_controller")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True, show_time=False, markup=True)],
-)
 
 
+# 每条 UNWIND 语句携带的最大行数，超大的导入拆成多批，避免单次参数过大
+IMPORT_BATCH_SIZE = 10_000
+
+_NON_WORD = re.compile(r"[^\w]")
+_MULTI_UNDERSCORE = re.compile(r"_+")
+_LEADING_DIGIT = re.compile(r"^\d")
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/&|])')
+
+
+@lru_cache(maxsize=4096)
 def safe_name(name: str) -> str:
     """
     将标签或关系类型中的非法字符替换为下划线
@@ -22,20 +33,125 @@ def safe_name(name: str) -> str:
     - 不允许以数字开头
     """
     # 替换非法字符为 _
-    safe = re.sub(r"[^\w]", "_", name)
+    safe = _NON_WORD.sub("_", name)
     # 合并连续下划线
-    safe = re.sub(r"_+", "_", safe)
+    safe = _MULTI_UNDERSCORE.sub("_", safe)
     # 去除首尾下划线（可选）
     safe = safe.strip("_")
     # 避免以数字开头
-    if re.match(r"^\d", safe):
+    if _LEADING_DIGIT.match(safe):
         safe = f"_{safe}"
     return safe
 
 
+def escape_lucene(text: str) -> str:
+    """
+    转义 Lucene 查询语法中的特殊字符，使实体名可直接用于全文索引查询
+    """
+    return _LUCENE_SPECIAL.sub(r"\\\1", text)
+
+
+@lru_cache(maxsize=512)
+def build_import_cypher(head_label: str, tail_label: str, rel_type: str) -> LiteralString:
+    """
+    生成某一 (头标签, 尾标签, 关系类型) 分组的 UNWIND 导入语句。
+    同一分组始终复用同一个字符串，Neo4j 按语句文本缓存执行计划，重复导入时不再重新规划。
+    """
+    # 标签和关系类型无法参数化，已经过 safe_name 处理后再拼接
+    return cast(
+        LiteralString,
+        f"""
+        UNWIND $rows AS r
+        MERGE (h:`{head_label}` {{id: r.head_id}})
+        SET h:Entity, h += r.head_properties,
+            h.name_embedding = coalesce(r.head_embedding, h.name_embedding)
+        MERGE (t:`{tail_label}` {{id: r.tail_id}})
+        SET t:Entity, t += r.tail_properties,
+            t.name_embedding = coalesce(r.tail_embedding, t.name_embedding)
+        MERGE (h)-[e:`{rel_type}`]->(t)
+        ON CREATE SET e += r.relation_properties
+        """,
+    )
+
+
+# 向量检索的得分下限。Neo4j 的 cosine 得分为 (1 + cos) / 2，Sørensen–Dice 的默认阈值 0.5
+# 只相当于 cos >= 0，几乎不做过滤；e5、bge 等模型无关文本的余弦相似度也常在 0.5 以上，
+# 因此单独取 0.85（cos >= 0.7）
+VECTOR_SCORE_THRESHOLD = 0.85
+
+# 实体匹配的两种种子检索片段，均以种子节点列表 seeds 结尾，后接 SUBGRAPH_CYPHER 展开子图
+# 向量检索：在 entity_name_vector 索引上为每个实体取 top_k 个最相近的节点
+VECTOR_SEEDS_CYPHER: LiteralString = """
+UNWIND $embeddings AS embedding
+CALL db.index.vector.queryNodes('entity_name_vector', $top_k, embedding)
+YIELD node AS n, score
+WHERE score >= $vector_threshold
+WITH collect(DISTINCT n) AS seeds
+"""
+
+# 全文检索：每个实体取 candidate_k 个候选节点，按 Sørensen–Dice 相似度保留前 top_k 个
+FULLTEXT_SEEDS_CYPHER: LiteralString = """
+UNWIND $entities AS entity
+CALL db.index.fulltext.queryNodes('entity_name_fulltext', entity.query, {limit: $candidate_k})
+YIELD node AS n
+WITH entity.name AS entity, n, apoc.text.sorensenDiceSimilarity(n.name, entity.name) AS similarity
+WHERE similarity >= $threshold
+ORDER BY similarity DESC
+WITH entity, collect(n)[..$top_k] AS matches
+WITH apoc.coll.toSet(apoc.coll.flatten(collect(matches))) AS seeds
+"""
+
+# 没有种子节点时不产生任何行，查询结果为空；
+# 由 APOC 按广度优先展开并在达到 limit 个节点时提前终止，返回去重后的节点和关系
+SUBGRAPH_CYPHER: LiteralString = """
+WITH seeds WHERE size(seeds) > 0
+CALL apoc.path.subgraphAll(seeds, {maxLevel: $depth, limit: $limit, bfs: true})
+YIELD nodes, relationships
+RETURN
+    apoc.coll.toSet([s IN seeds | s.name]) AS matched,
+    [node IN nodes | {name: node.name, description: node.description}] AS nodes,
+    [rel IN relationships[..$limit] | {type: type(rel), start: startNode(rel).name, end: endNode(rel).name}] AS relationships
+"""
+
+
+def dedupe_entities(entities: list[str]) -> list[str]:
+    """
+    去除首尾空白后按忽略大小写去重，保留每个实体第一次出现时的写法
+    """
+    unique: dict[str, str] = {}
+    for entity in entities:
+        entity = " ".join(entity.split())
+        if entity:
+            unique.setdefault(entity.casefold(), entity)
+    return list(unique.values())
+
+
 class Neo4jGraphController:
-    def __init__(self, url: str, username: str, password: str):
-        self.driver = AsyncGraphDatabase.driver(url, auth=(username, password))
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        embeddings: Optional[Embeddings] = None,
+        max_connection_pool_size: int = 64,
+        connection_acquisition_timeout: float = 30,
+    ):
+        self.driver = AsyncGraphDatabase.driver(
+            url,
+            auth=(username, password),
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+        )
+        # 配置向量模型后，实体检索改走 Neo4j 向量索引（HNSW）
+        self.embeddings = embeddings
+        # 实体匹配及子图展开的结果缓存，图数据变更时清空
+        self._search_cache: TTLCache[tuple[list[str], list[dict[str, list[dict]]]]] = (
+            TTLCache(maxsize=1024, ttl=120)
+        )
+        # 实体查询向量缓存，向量只取决于实体文本和模型，图数据变更时无需清空
+        self._query_embedding_cache: TTLCache[list[float]] = TTLCache(
+            maxsize=4096, ttl=3600
+        )
 
     async def close(self):
         await self.driver.close()
@@ -43,141 +159,276 @@ class Neo4jGraphController:
     async def ensure_indexes(self):
         """
         确保数据库中的索引存在，如果不存在则创建。
+        所有导入的节点都会带上公共标签 :Entity，索引建立在该标签上。
         """
         logger.info("🔍 正在检查并确保数据库索引...")
         async with self.driver.session() as session:
+            # 旧版本使用的占位标签索引不会命中任何节点，直接移除
+            await session.run("DROP INDEX node_name_index IF EXISTS")
             # 为节点的 name 属性创建索引，以加速实体匹配
-            index_query = "CREATE INDEX node_name_index IF NOT EXISTS FOR (n:LabelName) ON (n.name)"
-            await session.run(index_query)
-            logger.info("✅ 索引 'node_name_index' 已确保存在。")
+            await session.run(
+                "CREATE INDEX entity_name_index IF NOT EXISTS FOR (n:Entity) ON (n.name)"
+            )
+            logger.info("✅ 索引 'entity_name_index' 已确保存在。")
+            # 全文索引用于在相似度计算之前筛选候选实体
+            await session.run(
+                "CREATE FULLTEXT INDEX entity_name_fulltext IF NOT EXISTS "
+                "FOR (n:Entity) ON EACH [n.name]"
+            )
+            logger.info("✅ 全文索引 'entity_name_fulltext' 已确保存在。")
+            vector_index_created = False
+            if self.embeddings is not None:
+                result = await session.run(
+                    "SHOW VECTOR INDEXES YIELD name "
+                    "WHERE name = 'entity_name_vector' RETURN name"
+                )
+                vector_index_created = await result.single() is None
+                # 通过一次编码探测向量维度；索引内部以量化后的向量检索，
+                # 节点上仍保存原始 float 向量
+                dimensions = len(await self.embeddings.aembed_query("dimension"))
+                await session.run(
+                    """
+                    CREATE VECTOR INDEX entity_name_vector IF NOT EXISTS
+                    FOR (n:Entity) ON (n.name_embedding)
+                    OPTIONS {indexConfig: {
+                        `vector.dimensions`: $dimensions,
+                        `vector.similarity_function`: 'cosine',
+                        `vector.quantization.enabled`: true,
+                        `vector.hnsw.m`: 24,
+                        `vector.hnsw.ef_construction`: 128
+                    }}
+                    """,
+                    {"dimensions": dimensions},
+                )
+                logger.info(
+                    f"✅ 向量索引 'entity_name_vector' 已确保存在（维度: {dimensions}）。"
+                )
+        # 首次启用向量模型时，之前导入的实体还没有名称向量，向量检索匹配不到它们
+        if vector_index_created:
+            await self.backfill_name_embeddings()
+
+    async def migrate_entity_labels(self) -> int:
+        """
+        一次性迁移：为旧版本导入、缺少公共标签 :Entity 的节点补上标签。
+        需要扫描全图，不在启动时执行，由命令行任务 migrate 手动运行；
+        按批提交事务，避免大图上的单个事务占用过多内存。
+        Returns:
+            int: 补上标签的节点数量
+        """
+        async with self.driver.session() as session:
+            # CALL { ... } IN TRANSACTIONS 只能在自动提交事务中执行
+            result = await session.run(
+                """
+                MATCH (n) WHERE n.name IS NOT NULL AND NOT n:Entity
+                CALL { WITH n SET n:Entity } IN TRANSACTIONS OF 10000 ROWS
+                """
+            )
+            summary = await result.consume()
+        labels_added = summary.counters.labels_added
+        if labels_added:
+            self._search_cache.clear()
+        logger.info("✅ 已为 %d 个历史节点补上 :Entity 标签。", labels_added)
+        return labels_added
+
+    async def backfill_name_embeddings(self) -> int:
+        """
+        为缺少 name_embedding 的实体补齐名称向量，未配置向量模型时不做任何事。
+        Returns:
+            int: 补齐向量的实体名数量
+        """
+        if self.embeddings is None:
+            return 0
+        rows = await self.query(
+            "MATCH (n:Entity) WHERE n.name IS NOT NULL AND n.name_embedding IS NULL "
+            "RETURN DISTINCT n.name AS name",
+            read_only=True,
+        )
+        names = [row["name"] for row in rows]
+        if not names:
+            return 0
+        logger.info("🧠 正在为 %d 个实体名补齐向量...", len(names))
+        for start in range(0, len(names), IMPORT_BATCH_SIZE):
+            batch = names[start : start + IMPORT_BATCH_SIZE]
+            vectors = await self.embeddings.aembed_documents(batch)
+            await self.query(
+                """
+                UNWIND $rows AS r
+                MATCH (n:Entity {name: r.name})
+                WHERE n.name_embedding IS NULL
+                SET n.name_embedding = r.embedding
+                """,
+                {
+                    "rows": [
+                        {"name": name, "embedding": vector}
+                        for name, vector in zip(batch, vectors)
+                    ]
+                },
+            )
+        self._search_cache.clear()
+        logger.info("✅ 已为 %d 个实体名补齐向量。", len(names))
+        return len(names)
 
     async def query(
         self,
         cypher: LiteralString,
         parameters: Optional[dict] = None,
         session: Optional[AsyncSession] = None,
+        read_only: bool = False,
     ) -> list:
         """
         执行 Cypher 查询，支持外部 Session 复用。
+        未传入 Session 时通过 driver.execute_query 执行，由驱动管理连接池和重试；
+        read_only 为 True 时路由到读副本。
         """
         if session:
             result = await session.run(cypher, parameters or {})
             return await result.data()
-        async with self.driver.session() as session:
-            result = await session.run(cypher, parameters or {})
-            return await result.data()
+        records, _, _ = await self.driver.execute_query(
+            cypher,
+            parameters or {},
+            routing_=RoutingControl.READ if read_only else RoutingControl.WRITE,
+        )
+        return [record.data() for record in records]
 
     async def import_triples(self, triples: dict) -> None:
         if not triples or "triples" not in triples:
             raise ValueError("三元组数据格式不正确，请检查 LLM 输出。")
 
+        name_embeddings = await self._embed_names(triples["triples"])
+
+        # 按 (头标签, 尾标签, 关系类型) 分组，每组只执行一次 UNWIND 语句
+        groups: dict[tuple[str, str, str], list[dict]] = defaultdict(list)
+        for triple in triples["triples"]:
+            head = triple["head"]
+            relation = triple["relation"]
+            tail = triple["tail"]
+
+            key = (
+                safe_name(head["label"]),
+                safe_name(tail["label"]),
+                safe_name(relation["type"]),
+            )
+            head_properties = head.get("properties", {})
+            tail_properties = tail.get("properties", {})
+            groups[key].append(
+                {
+                    "head_id": head.get("id"),
+                    "head_properties": head_properties,
+                    "head_embedding": name_embeddings.get(head_properties.get("name")),
+                    "tail_id": tail.get("id"),
+                    "tail_properties": tail_properties,
+                    "tail_embedding": name_embeddings.get(tail_properties.get("name")),
+                    "relation_properties": relation.get("properties", {}),
+                }
+            )
+
         async with self.driver.session() as session:
             async with await session.begin_transaction() as tx:
-                for triple in triples["triples"]:
-                    head = triple["head"]
-                    relation = triple["relation"]
-                    tail = triple["tail"]
-
-                    head_label = safe_name(head["label"])
-                    tail_label = safe_name(tail["label"])
-                    rel_type = safe_name(relation["type"])
-
-                    # MERGE head node
-                    await tx.run(
-                        """
-                        CALL apoc.merge.node([$head_label], {id: $head_id}, $head_properties, $head_properties) YIELD node
-                        """,
-                        {
-                            "head_label": head_label,
-                            "head_id": head.get("id"),
-                            "head_properties": head.get("properties", {}),
-                        },
-                    )
-
-                    # MERGE tail node
-                    await tx.run(
-                        """
-                        CALL apoc.merge.node([$tail_label], {id: $tail_id}, $tail_properties, $tail_properties) YIELD node
-                        """,
-                        {
-                            "tail_label": tail_label,
-                            "tail_id": tail.get("id"),
-                            "tail_properties": tail.get("properties", {}),
-                        },
-                    )
-
-                    # MERGE relation
-                    await tx.run(
-                        """
-                        MATCH (h) WHERE h.id = $head_id AND $head_label IN labels(h)
-                        MATCH (t) WHERE t.id = $tail_id AND $tail_label IN labels(t)
-                        CALL apoc.merge.relationship(h, $rel_type, {}, $relation_properties, t) YIELD rel
-                        RETURN rel
-                        """,
-                        {
-                            "head_id": head.get("id"),
-                            "tail_id": tail.get("id"),
-                            "head_label": head_label,
-                            "tail_label": tail_label,
-                            "rel_type": rel_type,
-                            "relation_properties": relation.get("properties", {}),
-                        },
-                    )
-
-    async def search_likely_entities(
-        self, entities: list[str], threshold: float = 0.5, top_k: int = 5
-    ) -> list[str]:
-        if not entities:
-            return []
+                for (head_label, tail_label, rel_type), rows in groups.items():
+                    cypher = build_import_cypher(head_label, tail_label, rel_type)
+                    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+                        await tx.run(
+                            cypher, {"rows": rows[start : start + IMPORT_BATCH_SIZE]}
+                        )
+        self._search_cache.clear()
 
-        cypher = """
-        UNWIND $entities AS entity
-        MATCH (n)
-        WHERE n.name IS NOT NULL AND apoc.text.sorensenDiceSimilarity(n.name, entity) >= $threshold
-        WITH entity, n, apoc.text.sorensenDiceSimilarity(n.name, entity) AS similarity
-        ORDER BY similarity DESC
-        WITH entity, collect(n.name)[..$top_k] AS matches
-        RETURN apoc.coll.toSet(apoc.coll.flatten(collect(matches))) AS all_matches
+    async def _embed_names(self, triples: list[dict]) -> dict[str, list[float]]:
         """
-        async with self.driver.session() as session:
-            res = await session.run(
-                cypher, {"entities": entities, "threshold": threshold, "top_k": top_k}
-            )
-            data = await res.single()
-            if data and data["all_matches"]:
-                return data["all_matches"]
-        return []
-
-    async def query_subgraph(
-        self, entities: list[str], depth: int = 4, limit: int = 20
-    ) -> list[dict[str, list[dict]]]:
-        # 查询子图只返回节点和关系的名称和描述
+        对三元组中出现的实体名去重后批量编码，未配置向量模型时返回空字典
+        """
+        if self.embeddings is None:
+            return {}
+        unique_names = {
+            node.get("properties", {}).get("name")
+            for triple in triples
+            for node in (triple["head"], triple["tail"])
+        }
+        unique_names.discard(None)
+        names = sorted(unique_names)
+        vectors = await self.embeddings.aembed_documents(names)
+        return dict(zip(names, vectors))
+
+    async def _embed_queries(self, entities: list[str]) -> list[list[float]]:
+        """
+        编码实体查询向量，调用前需已配置向量模型。
+        查询与文档的编码参数可能不同（例如 e5 的 "query: " 前缀），不能借用 aembed_documents 批量编码；
+        向量模型提供 aembed_queries 时一次批量编码，否则各实体的 aembed_query 同时提交；
+        已编码过的实体直接从缓存取出，只编码未命中的实体
+        """
+        embeddings = cast(Embeddings, self.embeddings)
+        cache = self._query_embedding_cache
+        vectors = [cache.get(e) for e in entities]
+        missing = [e for e, vector in zip(entities, vectors) if vector is None]
+        if missing:
+            aembed_queries = getattr(embeddings, "aembed_queries", None)
+            if aembed_queries is not None:
+                encoded_vectors = await aembed_queries(missing)
+            else:
+                encoded_vectors = await asyncio.gather(
+                    *(embeddings.aembed_query(e) for e in missing)
+                )
+            encoded = dict(zip(missing, encoded_vectors))
+            for entity, vector in encoded.items():
+                cache.set(entity, vector)
+            vectors = [
+                vector if vector is not None else encoded[e]
+                for e, vector in zip(entities, vectors)
+            ]
+        return cast(list[list[float]], vectors)
+
+    async def query_subgraph_by_entities(
+        self,
+        entities: list[str],
+        depth: int = 4,
+        limit: int = 20,
+        threshold: float = 0.5,
+        top_k: int = 5,
+        candidate_k: int = 50,
+        vector_threshold: float = VECTOR_SCORE_THRESHOLD,
+    ) -> tuple[list[str], list[dict[str, list[dict]]]]:
+        """
+        在一次查询中完成实体匹配与子图展开，子图只返回节点和关系的名称和描述。
+        配置了向量模型时使用向量索引做近似最近邻检索，按 vector_threshold 过滤 cosine 得分；
+        否则先通过全文索引为每个实体取 candidate_k 个候选节点，再用 Sørensen–Dice 相似度重排，
+        按 threshold 过滤。
+        结果按去重后的实体和查询参数缓存，图数据变更时清空。
+        Returns:
+            tuple: (匹配到的实体名列表, 子图列表)，没有匹配到实体时均为空
+        """
+        entities = dedupe_entities(entities)
         if not entities:
-            return []
-
-        cypher = """
-        MATCH (n)
-        WHERE n.name IN $entities
-        CALL apoc.path.expand(n, null, null, 0, $depth) YIELD path
-        WITH collect(path) AS paths
-        WITH apoc.coll.flatten([p IN paths | nodes(p)]) AS all_nodes, 
-            apoc.coll.flatten([p IN paths | relationships(p)]) AS all_rels
-        WITH apoc.coll.toSet(all_nodes) AS nodes, apoc.coll.toSet(all_rels) AS relationships
-        WITH nodes, relationships, $limit AS limit
-        WITH
-            [i IN range(0, size(nodes) - 1) WHERE i < limit | nodes[i]] AS sliced_nodes,
-            [i IN range(0, size(relationships) - 1) WHERE i < limit | relationships[i]] AS sliced_relationships
-        RETURN 
-            [node IN sliced_nodes | {name: node.name, description: node.description}] AS nodes,
-            [rel IN sliced_relationships | {type: type(rel), start: startNode(rel).name, end: endNode(rel).name}] AS relationships
-        """
-        subgraphs = await self.query(
-            cypher, {"entities": entities, "depth": depth, "limit": limit}
+            return [], []
+        cache_key = (
+            tuple(entities),
+            depth,
+            limit,
+            threshold,
+            top_k,
+            candidate_k,
+            vector_threshold,
         )
-        if not subgraphs:
-            return []
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            matched, subgraphs = cached
+            return list(matched), list(subgraphs)
 
-        return subgraphs
+        parameters: dict = {"depth": depth, "limit": limit, "top_k": top_k}
+        if self.embeddings is not None:
+            parameters["embeddings"] = await self._embed_queries(entities)
+            parameters["vector_threshold"] = vector_threshold
+            seeds = VECTOR_SEEDS_CYPHER
+        else:
+            parameters["entities"] = [
+                {"name": entity, "query": escape_lucene(entity)} for entity in entities
+            ]
+            parameters["threshold"] = threshold
+            parameters["candidate_k"] = candidate_k
+            seeds = FULLTEXT_SEEDS_CYPHER
+
+        rows = await self.query(seeds + SUBGRAPH_CYPHER, parameters, read_only=True)
+        matched = rows[0].pop("matched") if rows else []
+        self._search_cache.set(cache_key, (matched, rows))
+        return list(matched), list(rows)
 
     async def execute_cypher(
         self,
@@ -188,12 +439,15 @@ class Neo4jGraphController:
         """
         执行任意 Cypher 语句，通常用于创建或更新数据。
         """
-        logger.info(f"执行 Cypher 语句: {cypher}，参数: {parameters}")
+        logger.info("执行 Cypher 语句: %s", cypher)
+        logger.debug("Cypher 参数: %s", parameters)
         if session:
             await session.run(cypher, parameters or {})
         else:
             async with self.driver.session() as session:
                 await session.run(cypher, parameters or {})
+        # 任意语句都可能修改图数据，缓存的检索结果不再可信
+        self._search_cache.clear()
         logger.info("✅ Cypher 语句执行成功。")
 
 
@@ -203,6 +457,12 @@ if __name__ == "__main__":
     from dotenv import load_dotenv
 
     load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(rich_tracebacks=True, show_time=False, markup=True)],
+    )
     graph_controller = Neo4jGraphController(
         url=os.getenv("NEO4J_URL", "enter_your_neo4j_url_in_.env"),
         username=os.getenv("NEO4J_USER", "enter_your_neo4j_username_in_.env"),
@@ -1,19 +1,154 @@
 import io
-import json
 import logging
+import sys
 import xml.etree.ElementTree as ET
+from functools import lru_cache
+from hashlib import blake2b
 from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator
 
+import orjson
 from rich.logging import RichHandler
 
 # --- 日志记录器设置 ---
+# 作为库导入时不配置根日志，由 web.py / utils.py 等入口统一配置；直接运行本模块时在 __main__ 中配置
 logger = logging.getLogger("SysMLParser")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    handlers=[RichHandler(rich_tracebacks=True, show_time=False, markup=True)],
+
+# --- 图类型识别规则: 图类型 -> (stereotype, xmi:type)，None 表示不限制 ---
+# 同一个 contents 元素可能同时满足多条规则（例如包图的 xmi:type 也是 TClassDiagram）
+DIAGRAM_KINDS: dict[str, tuple[str | None, str | None]] = {
+    "requirement": ("SysmlRequirementDiagram", None),
+    "internal_block": ("SysmlInternalBlockDiagram", None),
+    "block": ("SysmlBlockDiagram", None),
+    "usecase": (None, "trufun:TUsecaseDiagram"),
+    "activity": (None, "trufun:TActivityDiagram"),
+    "class": (None, "trufun:TClassDiagram"),
+    "state_machine": ("SysMLStateDiagram", "trufun:TStateMachineDiagram"),
+    "sequence": ("SysMLSequenceDiagram", "trufun:TSequenceDiagram"),
+    "package": ("SysMlPackageDiagram", None),
+    "parametric": ("SysmlParameterDiagram", "trufun:TCompositeStructureDiagram"),
+    "table": (None, "trufun:TTable"),
+}
+
+# --- 节点 xmi:type -> 显示名称，按类型一次查表代替逐个比较的 if/elif 链 ---
+# 内部块图中的部件属性还需结合 type 属性判断，在提取时单独处理
+IBD_NODE_LABELS: dict[str, Callable[[str], str]] = {
+    "trufun:TStructureClassNode": lambda name: f"上下文块: {name}",
+    # 端口名称可能带有类型信息和波浪线（反向接口）
+    "trufun:TPortNode": lambda name: f"端口: {name.replace(':', '').replace('~', '').strip()}",
+}
+
+ACTIVITY_NODE_LABELS: dict[str, Callable[[str], str]] = {
+    "trufun:TInitialNode": lambda name: "起始节点",
+    "trufun:TActivityFinalNode": lambda name: "活动终点",
+    "trufun:TDecisionNode": lambda name: "决策节点",
+    "trufun:TActionNode": lambda name: name,  # Use node_name directly
+    "trufun:TInputPinNode": lambda name: (
+        f"输入引脚: {name.replace(':', '').strip()}" if name else "输入引脚"
+    ),
+    "trufun:TOutputPinNode": lambda name: (
+        f"输出引脚: {name.replace(':', '').strip()}" if name else "输出引脚"
+    ),
+    "trufun:TCommentNode": lambda name: f"注释: {name}",
+    "trufun:TCallBehaviorAction": lambda name: f"调用行为: {name}",
+    "trufun:TSubjectNode": lambda name: f"泳道: {name}",  # Activity Partition
+    "trufun:TActivityNode": lambda name: f"顶层活动: {name}",  # Main Activity Node
+}
+
+# --- 类图中作为实体加入映射的节点类型，以及其中作为主要实体输出日志的类型 ---
+CLASS_ENTITY_NODE_TYPES = frozenset(
+    {
+        "trufun:TClassNode",
+        "trufun:TModelElementNode",  # Capture all TModelElementNodes
+        "trufun:TCommentNode",  # Capture Comment Nodes like HyperLink
+    }
+)
+CLASS_PRIMARY_NODE_TYPES = frozenset({"trufun:TClassNode", "trufun:TModelElementNode"})
+
+# --- 序列图中的激活（执行规约）节点类型 ---
+SEQUENCE_ACTIVATION_NODE_TYPES = frozenset(
+    {"trufun:TInvocationSpecificationNode", "trufun:TExecutionSpecificationNode"}
+)
+
+# --- 序列图中需要继续向下遍历的容器节点类型（生命线除外） ---
+SEQUENCE_CONTAINER_NODE_TYPES = SEQUENCE_ACTIVATION_NODE_TYPES | {
+    "trufun:TCombinedFragmentNode",
+    "trufun:TInteractionOperandNode",
+}
+
+# 序列图中按类型生成显示名的节点 (node_id, name) -> 显示名；生命线和组合片段需要额外属性，在提取时单独处理
+SEQUENCE_NODE_LABELS: dict[str, Callable[[str, str], str]] = {
+    # Activations are usually unnamed
+    "trufun:TInvocationSpecificationNode": lambda node_id, name: name or f"激活 ({node_id})",
+    "trufun:TExecutionSpecificationNode": lambda node_id, name: name or f"激活 ({node_id})",
+    "trufun:TEventOccurrenceNode": lambda node_id, name: f"事件 ({node_id})",  # Usually unnamed
+    "trufun:TStateInvariantNode": lambda node_id, name: f"状态不变量 ({name or node_id})",
+    # Interaction Use (ref)
+    "trufun:TInteractionOccurrenceNode": lambda node_id, name: f"交互使用 ({name or node_id})",
+    "trufun:TInteractionOperandNode": lambda node_id, name: f"操作数 ({name or node_id})",
+}
+
+# --- 序列图中不加入名称映射的可视节点和显示标签类型 ---
+SEQUENCE_SKIPPED_NODE_TYPES = frozenset(
+    {"trufun:TMountingLinkNode", "trufun:TSplitterNode", "trufun:SubLabel"}
 )
 
+# --- 类图节点的分栏类型 -> (显示名称, 颜色, 缺省条目名)，按输出顺序排列 ---
+CLASS_COMPARTMENTS: dict[str, tuple[str, str, str]] = {
+    "part_properties": ("部件属性", "cyan", "未命名部件"),
+    "constraint_properties": ("约束属性", "cyan", "未命名约束"),
+    # Original attribute/operation compartments (might be less relevant for SysML-like XML)
+    "attributes": ("属性", "cyan", "未命名属性"),
+    "operations": ("操作", "purple", "未命名操作"),
+}
+
+# 状态机图中的超链接注释还需结合 type 属性判断，在提取时单独处理
+STATE_MACHINE_NODE_LABELS: dict[str, Callable[[str], str]] = {
+    "trufun:TStateMachineNode": lambda name: f"状态机: {name if name else '未命名'}",
+    "trufun:TRegionNode": lambda name: f"区域: {name if name else '未命名'}",
+    "trufun:TInitialStateNode": lambda name: "初始状态",
+    "trufun:TFinalStateNode": lambda name: "最终状态",  # Not in provided XML, but common
+    "trufun:TCompositeStateNode": lambda name: f"状态: {name if name else '未命名'}",
+    "trufun:TChoiceStateNode": lambda name: "选择伪状态",
+    # 以下伪状态未出现在示例 XML 中
+    "trufun:TJoinStateNode": lambda name: "连接伪状态",
+    "trufun:TForkStateNode": lambda name: "分叉伪状态",
+    "trufun:TEntryPointNode": lambda name: "入口点伪状态",
+    "trufun:TExitPointNode": lambda name: "出口点伪状态",
+}
+
+# 状态机结构日志中各类简单状态/伪状态的前缀图标，未列出的类型使用 ⚪
+STATE_MACHINE_NODE_ICONS: dict[str, str] = {
+    "trufun:TInitialStateNode": "➡️",
+    "trufun:TChoiceStateNode": "❓",
+}
+
+
+@lru_cache(maxsize=256)
+def clean_connection_type(xmi_type: str) -> str:
+    """
+    将连接的 xmi:type 转为简短的关系名，例如 trufun:TGeneralizeConnection -> Generalize。
+    不同的连接类型只有几十种，缓存后每种只需计算一次
+    """
+    return xmi_type.split(":")[-1].replace("T", "").replace("Connection", "")
+
+
+@lru_cache(maxsize=256)
+def dotted_type_name(type_attr: str) -> str:
+    """
+    取点分类型名的最后一段，例如 New.ContainmentConnection -> ContainmentConnection
+    """
+    return type_attr.split(".")[-1] if "." in type_attr else type_attr
+
+
+@lru_cache(maxsize=4096)
+def node_id_for_name(name: str) -> str:
+    """
+    由节点名称生成稳定的节点 ID，相同名称得到相同 ID，且不随进程的哈希随机化变化。
+    同一名称常在多个三元组中出现，缓存后每个名称只需计算一次摘要
+    """
+    return blake2b(name.encode("utf-8"), digest_size=8).hexdigest()
+
 
 class SysMLParser:
     """
@@ -21,88 +156,182 @@ class SysMLParser:
     支持提取模型元素的名称、ID、连接关系等，并将其存储为三元组形式。
     """
 
-    def __init__(self, file_content: str):
-        self.file_content = file_content
+    def __init__(
+        self,
+        file_content: str | bytes | None = None,
+        source: str | Path | IO[bytes] | None = None,
+    ):
+        """
+        Args:
+            file_content (str | bytes): TMX 文件内容
+            source (str | Path | IO[bytes]): TMX 文件路径或已打开的二进制流，
+                与 file_content 二选一；由 iterparse 边读边解析，不必先把整个文件读成字符串
+        """
+        if (file_content is None) == (source is None):
+            raise ValueError("file_content 与 source 必须且只能提供一个")
+        if source is None:
+            source = (
+                io.StringIO(file_content)
+                if isinstance(file_content, str)
+                else io.BytesIO(file_content)
+            )
+        self._source = source
         self.root = None
         self.namespaces = {}
         self._model_elements_by_id = {}  # 新增: 全局模型元素ID到名称的映射
+        self._names_by_id = {}  # 元素ID到去除首尾空白后的 name 属性，加载时只处理一次
+        self._diagrams = {kind: [] for kind in DIAGRAM_KINDS}  # 按图类型归类的图元素
         self.triples = []  # 用于存储提取的三元组
 
         self.load_xml()
 
     def load_xml(self):
         # 解析命名空间（关键修复）
-        # 使用列表推导式确保迭代器在使用后被清空，或者至少只迭代一次
+        # iterparse 在收集命名空间的同时构建整棵树，读取完毕后通过 root 属性取得根元素，
+        # 整个文件只解析一次
         ns_list = []
-        f = io.StringIO(self.file_content)
-        for event, (prefix, uri) in ET.iterparse(f, events=["start-ns"]):
+        events = ET.iterparse(self._source, events=["start-ns"])
+        for event, (prefix, uri) in events:
             ns_list.append((prefix, uri))
         self.namespaces = {
             prefix if prefix else "default": uri for prefix, uri in ns_list
         }
+        self.root = events.root  # type: ignore[attr-defined]
+        # 解析完成后不再持有原始内容，只保留元素树
+        self._source = None
 
-        # 使用 ElementTree 加载并解析 XML 内容
-        tree = ET.fromstring(self.file_content)
-        self.root = tree
+        # xmi:id / xmi:type 的 Clark 形式属性名只需计算一次
+        xmi_uri = self.namespaces.get("xmi", "")
+        self._xmi_id_key = f"{{{xmi_uri}}}id"
+        self._xmi_type_key = f"{{{xmi_uri}}}type"
 
         # --- 新增: 遍历所有元素，构建全局ID到名称的映射 ---
         # 这有助于在解析引用（如生命线的owner）时查找名称
+        xmi_id_key, xmi_type_key = self._xmi_id_key, self._xmi_type_key
+        elements_by_id = self._model_elements_by_id
+        names_by_id = self._names_by_id
         for elem in self.root.iter():
-            elem_id = elem.get(f"{{{self.namespaces.get('xmi', '')}}}id")
+            elem_id = elem.get(xmi_id_key)
+            if not elem_id:
+                continue
+            # 驻留 ID 字符串：全局映射常驻内存，作为键的 ID 只保留一份
+            elem_id = sys.intern(elem_id)
             elem_name = elem.get("name")
-            if elem_id:
-                if elem_name:
-                    self._model_elements_by_id[elem_id] = elem_name
+            if elem_name is not None:
+                names_by_id[elem_id] = elem_name.strip()
+            if elem_name:
+                elements_by_id[elem_id] = elem_name
+                continue
+
+            # 一次遍历子元素，同时找出第一个 stereotypeNodes 和 alias 为 Name 的 subLabels
+            stereotype_nodes = sub_label_name_elem = None
+            for child in elem:
+                child_tag = child.tag
+                if child_tag == "stereotypeNodes":
+                    if stereotype_nodes is None:
+                        stereotype_nodes = child
+                elif child_tag == "subLabels":
+                    if sub_label_name_elem is None and child.get("alias") == "Name":
+                        sub_label_name_elem = child
+                if stereotype_nodes is not None and sub_label_name_elem is not None:
+                    break
+
+            # 尝试从StereotypeNodes中获取名称，例如 <<block>>
+            if stereotype_nodes is not None:
+                stereotype_name = stereotype_nodes.get("name")
+                if stereotype_name:
+                    elements_by_id[elem_id] = stereotype_name.strip("<>").strip()
+                    continue
+            # 尝试从SubLabels中获取主名称
+            if sub_label_name_elem is not None:
+                sub_label_name = sub_label_name_elem.get("name")
+                if sub_label_name is not None:
+                    elements_by_id[elem_id] = sub_label_name.strip()
                 else:
-                    # 尝试从StereotypeNodes中获取名称，例如 <<block>>
-                    # 需要确保 findall/find 传入 namespaces
-                    stereotype_nodes = elem.find(
-                        "./stereotypeNodes", namespaces=self.namespaces
-                    )
-                    if stereotype_nodes is not None:
-                        stereotype_name = stereotype_nodes.get("name")
-                        if stereotype_name:
-                            self._model_elements_by_id[elem_id] = stereotype_name.strip(
-                                "<>"
-                            ).strip()
-                            continue
-                    # 尝试从SubLabels中获取主名称
-                    sub_label_name_elem = elem.find(
-                        "./subLabels[@alias='Name']", namespaces=self.namespaces
-                    )
-                    if sub_label_name_elem is not None:
-                        sub_label_name = sub_label_name_elem.get("name")
-                        if sub_label_name is not None:
-                            self._model_elements_by_id[elem_id] = sub_label_name.strip()
-                        else:
-                            self._model_elements_by_id[elem_id] = (
-                                f"未知元素 (ID: {elem_id})"
-                            )
-                        continue
-
-                    # Fallback: use xmi:type as a descriptor if no name found
-                    elem_xmi_type = elem.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
-                    )
-                    if elem_xmi_type:
-                        self._model_elements_by_id[elem_id] = (
-                            self._strip_ns(elem_xmi_type)
-                            .replace("trufun:", "")
-                            .replace("T", "")
-                            + " (类型)"
-                        )
-                    else:
-                        self._model_elements_by_id[elem_id] = (
-                            f"未知元素 (ID: {elem_id})"
-                        )
+                    elements_by_id[elem_id] = f"未知元素 (ID: {elem_id})"
+                continue
+
+            # Fallback: use xmi:type as a descriptor if no name found
+            elem_xmi_type = elem.get(xmi_type_key)
+            if elem_xmi_type:
+                elements_by_id[elem_id] = (
+                    elem_xmi_type.replace("trufun:", "").replace("T", "") + " (类型)"
+                )
+            else:
+                elements_by_id[elem_id] = f"未知元素 (ID: {elem_id})"
         # --- 结束新增 ---
 
+        self._index_diagrams()
+
         logger.info("✅ 成功加载 XML 文件")
 
-    def _strip_ns(self, tag):
-        return tag.split("}")[-1] if "}" in tag else tag
+    def _index_diagrams(self):
+        """
+        遍历一次整棵树，按 DIAGRAM_KINDS 将 contents 元素归类到各图类型下，
+        各 extract_* 方法直接遍历对应列表，无需各自再扫描整棵树。列表保持文档顺序。
+        """
+        diagrams = {kind: [] for kind in DIAGRAM_KINDS}
+        xmi_type_key = self._xmi_type_key
+        # contents 元素没有前缀，只有声明了默认命名空间时才带 URI；
+        # 按标签过滤交给 iter 在 C 层完成，无需逐个元素去掉命名空间再比较
+        default_uri = self.namespaces.get("default")
+        contents_tag = f"{{{default_uri}}}contents" if default_uri else "contents"
+        for elem in self.root.iter(contents_tag):
+            stereotype = elem.get("stereotype")
+            xmi_type = elem.get(xmi_type_key)
+            for kind, (kind_stereotype, kind_xmi_type) in DIAGRAM_KINDS.items():
+                if (kind_stereotype is None or stereotype == kind_stereotype) and (
+                    kind_xmi_type is None or xmi_type == kind_xmi_type
+                ):
+                    diagrams[kind].append(elem)
+        self._diagrams = diagrams
+
+    @staticmethod
+    def _connection_endpoint_ids(diagram_elem):
+        """
+        收集图中所有连接的 source/target ID。不输出日志时，节点映射只有这些 ID 会被查找，
+        各 extract_* 方法据此跳过其余节点，不再为它们构造显示名
+        """
+        return {
+            endpoint_id
+            for conn in diagram_elem.findall("connections")
+            for endpoint_id in (conn.get("source"), conn.get("target"))
+        }
+
+    def _collect_connection_triples(self, diagram_elem, node_id_to_name):
+        """
+        用一个推导式生成图中所有连接的 (源, 关系, 目标) 三元组，跳过缺少端点的连接。
+        关系名由 xmi:type 清理得到（如 trufun:TGeneralizeConnection -> Generalize），
+        没有 xmi:type 时退回使用标签名；“未知节点”占位名只在查找未命中时才构造
+        """
+        get_name = node_id_to_name.get
+        xmi_type_key = self._xmi_type_key
+        return [
+            (
+                (
+                    source_name
+                    if (source_name := get_name(source_id)) is not None
+                    else f"未知节点 (ID: {source_id})"
+                ),
+                (
+                    clean_connection_type(conn_xmi_type)
+                    if (conn_xmi_type := conn.get(xmi_type_key))
+                    else conn.tag.rpartition("}")[2]
+                ),
+                (
+                    target_name
+                    if (target_name := get_name(target_id)) is not None
+                    else f"未知节点 (ID: {target_id})"
+                ),
+            )
+            for conn in diagram_elem.findall("connections")
+            if (source_id := conn.get("source")) and (target_id := conn.get("target"))
+        ]
 
     def extract_requirement_diagrams(self):
+        self.triples.extend(self.iter_requirement_triples())
+
+    def iter_requirement_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取需求图。[/bold yellow]"
@@ -111,94 +340,92 @@ class SysMLParser:
 
         logger.info("\n📜 [bold yellow]开始提取需求图及其结构关系[/bold yellow]")
 
-        # Iterate through all elements to find Requirement Diagrams
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # Find the diagram element based on its stereotype
-            if (
-                tag == "contents"
-                and elem.get("stereotype") == "SysmlRequirementDiagram"
-            ):
-                req_diagram_elem = elem
-                diagram_name = req_diagram_elem.get("name", "未命名需求图")
-                logger.info(f"\n🧾 分析需求图: [bold]{diagram_name}[/bold]")
-
-                # --- 1. Extract all Requirement nodes and their properties ---
-                node_id_to_name = {}
-                for node in req_diagram_elem.findall(
-                    ".//nodes[@stereotype='<<requirement>>']",
-                    namespaces=self.namespaces,
-                ):
-                    node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                    req_name = node.get("name", "未命名需求").strip()
-
-                    if node_id:
-                        node_id_to_name[node_id] = req_name
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        # Iterate through the Requirement Diagrams indexed in load_xml
+        for elem in self._diagrams["requirement"]:
+            req_diagram_elem = elem
+            diagram_name = req_diagram_elem.get("name", "未命名需求图")
+            logger.info("\n🧾 分析需求图: [bold]%s[/bold]", diagram_name)
+
+            # --- 1. Extract all Requirement nodes and their properties ---
+            node_id_to_name = {}
+            # 带属性条件的路径会走 ElementPath 的 Python 选择器链；按标签遍历在 C 层完成，再直接比较属性
+            for node in req_diagram_elem.iter("nodes"):
+                if node.get("stereotype") != "<<requirement>>":
+                    continue
+                node_id = node.get(xmi_id_key)
+                req_name = names_get(node_id, "未命名需求")
+
+                if node_id:
+                    node_id_to_name[node_id] = req_name
+                    if log_info:
                         logger.info(
-                            f"  🔹 发现需求节点: [bold green]{req_name}[/bold green]"
+                            "  🔹 发现需求节点: [bold green]%s[/bold green]", req_name
                         )
-
-                        props_compartment = node.find(
-                            "./nodes[@type='stereotype_properties']",
-                            namespaces=self.namespaces,
+                        props_compartment = next(
+                            (
+                                child
+                                for child in node.iterfind("nodes")
+                                if child.get("type") == "stereotype_properties"
+                            ),
+                            None,
                         )
                         if props_compartment is not None:
-                            for prop in props_compartment.findall(
-                                "./nodes[@type='ListCompartmentChild']",
-                                namespaces=self.namespaces,
-                            ):
+                            for prop in props_compartment.findall("nodes"):
+                                if prop.get("type") != "ListCompartmentChild":
+                                    continue
                                 prop_name = prop.get("name", "未命名属性").strip()
                                 clean_prop_name = prop_name.split(":")[0].strip()
                                 logger.info(
                                     f"    🔸 属性: [cyan]{clean_prop_name}[/cyan]"
                                 )
 
-                # --- 2. Extract and resolve connections (relationships) ---
-                found_connections = False
-                for conn in req_diagram_elem.findall(
-                    "./connections", namespaces=self.namespaces
-                ):
-                    source_id = conn.get("source")
-                    target_id = conn.get("target")
-
-                    if source_id and target_id:
-                        found_connections = True
-                        source_name = node_id_to_name.get(
-                            source_id, f"未知节点 (ID: {source_id})"
-                        )
-                        target_name = node_id_to_name.get(
-                            target_id, f"未知节点 (ID: {target_id})"
-                        )
-
-                        # --- THIS IS THE CORRECTED LOGIC ---
-                        conn_type = "Unknown"  # Default value
-
-                        # Priority 1: Check for a 'stereotype' attribute (e.g., "<<allocate>>")
-                        stereotype_attr = conn.get("stereotype")
-                        if stereotype_attr:
-                            conn_type = stereotype_attr.strip("<>").capitalize()
-                        else:
-                            # Priority 2: Check for a 'type' attribute (e.g., "New.ContainmentConnection")
-                            type_attr = conn.get("type")
-                            if type_attr:
-                                conn_type = (
-                                    type_attr.split(".")[-1]
-                                    if "." in type_attr
-                                    else type_attr
-                                )
-                        # --- END OF CORRECTED LOGIC ---
+            # --- 2. Extract and resolve connections (relationships) ---
+            get_name = node_id_to_name.get
+            found_connections = False
+            for conn in req_diagram_elem.findall("connections"):
+                source_id = conn.get("source")
+                target_id = conn.get("target")
+
+                if source_id and target_id:
+                    found_connections = True
+                    source_name = get_name(source_id)
+                    if source_name is None:
+                        source_name = f"未知节点 (ID: {source_id})"
+                    target_name = get_name(target_id)
+                    if target_name is None:
+                        target_name = f"未知节点 (ID: {target_id})"
+
+                    # --- THIS IS THE CORRECTED LOGIC ---
+                    conn_type = "Unknown"  # Default value
+
+                    # Priority 1: Check for a 'stereotype' attribute (e.g., "<<allocate>>")
+                    stereotype_attr = conn.get("stereotype")
+                    if stereotype_attr:
+                        conn_type = stereotype_attr.strip("<>").capitalize()
+                    else:
+                        # Priority 2: Check for a 'type' attribute (e.g., "New.ContainmentConnection")
+                        type_attr = conn.get("type")
+                        if type_attr:
+                            conn_type = dotted_type_name(type_attr)
+                    # --- END OF CORRECTED LOGIC ---
 
+                    if log_info:
                         logger.info(
                             f"  🔗 关系 ([blue]{conn_type}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]"
                         )
-                        # Store the triple for later use
-                        self.triples.append((source_name, conn_type, target_name))
+                    # Store the triple for later use
+                    yield (source_name, conn_type, target_name)
 
-                if not found_connections:
-                    logger.info("  -> No connections found in this diagram.")
+            if not found_connections:
+                logger.info("  -> No connections found in this diagram.")
 
     def extract_internal_block_diagrams(self):
+        self.triples.extend(self.iter_internal_block_triples())
+
+    def iter_internal_block_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取内部块图。[/bold yellow]"
@@ -207,109 +434,105 @@ class SysMLParser:
 
         logger.info("\n🧩 [bold magenta]开始提取内部块图及其连接关系[/bold magenta]")
 
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            if (
-                tag == "contents"
-                and elem.get("stereotype") == "SysmlInternalBlockDiagram"
-            ):
-                diagram_name = elem.get("name", "未命名内部块图")
-                logger.info(f"\n📊 分析内部块图: [bold]{diagram_name}[/bold]")
-
-                node_id_to_name = {}
-                # 为了包含最外层上下文块以及内部的part property和port
-                # 遍历所有可能作为节点的元素，包括 TStructureClassNode (上下文), TModelElementNode (part), TPortNode
-                # 以及这些节点内部的SubLabel等，但SubLabel通常只用于显示，不作为独立node_id_to_name的键
-                for node in elem.findall(".//nodes", namespaces=self.namespaces):
-                    node_xmi_type = node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
-                    )
-                    node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                    node_name = node.get(
-                        "name", ""
-                    ).strip()  # 端口可能没有name，或name是带冒号的
-
-                    if node_id:
-                        display_name = node_name  # 默认显示名称
-
-                        if node_xmi_type == "trufun:TStructureClassNode":
-                            display_name = f"上下文块: {node_name}"
-                        elif (
-                            node_xmi_type == "trufun:TModelElementNode"
-                            and node.get("type") == "SysML.IBD.PartProperty"
-                        ):
-                            # 部件属性通常以冒号开头
-                            display_name = f"部件: {node_name.lstrip(': ').strip()}"
-                        elif node_xmi_type == "trufun:TPortNode":
-                            # 端口名称可能带有类型信息和波浪线（反向接口）
-                            display_name = f"端口: {node_name.replace(':', '').replace('~', '').strip()}"
-                        elif node_xmi_type == "trufun:SubLabel":
-                            # SubLabel 仅为可视化标签，不作为独立逻辑节点加入映射
-                            continue
-                        else:
-                            # Fallback for other unexpected node types
-                            if node_name:  # 确保有名称才记录
-                                display_name = f"其他节点 ({self._strip_ns(node_xmi_type)}): {node_name}"
-                            else:  # 如果没名称，就用ID
-                                display_name = f"其他节点 ({self._strip_ns(node_xmi_type)}): ID {node_id}"
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        xmi_type_key = self._xmi_type_key
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        for elem in self._diagrams["internal_block"]:
+            diagram_name = elem.get("name", "未命名内部块图")
+            logger.info("\n📊 分析内部块图: [bold]%s[/bold]", diagram_name)
+
+            node_id_to_name = {}
+            # 为了包含最外层上下文块以及内部的part property和port
+            # 遍历所有可能作为节点的元素，包括 TStructureClassNode (上下文), TModelElementNode (part), TPortNode
+            # 以及这些节点内部的SubLabel等，但SubLabel通常只用于显示，不作为独立node_id_to_name的键
+            # 不输出日志时只有连接端点会被查找，其余节点跳过
+            endpoint_ids = None if log_info else self._connection_endpoint_ids(elem)
+            for node in elem.iter("nodes"):
+                node_id = node.get(xmi_id_key)
+                if endpoint_ids is not None and node_id not in endpoint_ids:
+                    continue
+                node_xmi_type = node.get(xmi_type_key)
+                node_name = names_get(node_id, "")  # 端口可能没有name，或name是带冒号的
+
+                if node_id:
+                    if node_xmi_type == "trufun:SubLabel":
+                        # SubLabel 仅为可视化标签，不作为独立逻辑节点加入映射
+                        continue
 
-                        node_id_to_name[node_id] = display_name
-                        # 仅记录主要节点类型，不记录所有SubLabel或 CompartmentNode
-                        if (
-                            node_xmi_type is not None
-                            and "CompartmentNode" not in node_xmi_type
-                            and "SubLabel" not in node_xmi_type
-                        ):
+                    if (
+                        node_xmi_type == "trufun:TModelElementNode"
+                        and node.get("type") == "SysML.IBD.PartProperty"
+                    ):
+                        # 部件属性通常以冒号开头
+                        display_name = f"部件: {node_name.lstrip(': ').strip()}"
+                    elif make_label := IBD_NODE_LABELS.get(node_xmi_type):
+                        display_name = make_label(node_name)
+                    else:
+                        # Fallback for other unexpected node types
+                        if node_name:  # 确保有名称才记录
+                            display_name = f"其他节点 ({node_xmi_type}): {node_name}"
+                        else:  # 如果没名称，就用ID
+                            display_name = f"其他节点 ({node_xmi_type}): ID {node_id}"
+
+                    node_id_to_name[node_id] = display_name
+                    # 仅记录主要节点类型，不记录所有SubLabel或 CompartmentNode
+                    if (
+                        node_xmi_type is not None
+                        and "CompartmentNode" not in node_xmi_type
+                        and "SubLabel" not in node_xmi_type
+                    ):
+                        if log_info:
                             logger.info(f"  🟢 {display_name}")
 
-                found_connections = False
-                for conn in elem.findall("./connections", namespaces=self.namespaces):
-                    source_id = conn.get("source")
-                    target_id = conn.get("target")
-
-                    if source_id and target_id:
-                        found_connections = True
-                        source_name = node_id_to_name.get(
-                            source_id, f"未知节点 (ID: {source_id})"
-                        )
-                        target_name = node_id_to_name.get(
-                            target_id, f"未知节点 (ID: {target_id})"
-                        )
-
-                        # --- 修改的连接类型识别逻辑 ---
-                        conn_type = "Unknown"  # Default value
-
-                        # 优先级1: 检查 specific 'type' attribute (e.g., SysML.IBD.Connector)
-                        specific_type_attr = conn.get("type")
-                        if specific_type_attr == "SysML.IBD.Connector":
-                            conn_type = "Connector"
+            get_name = node_id_to_name.get
+
+            found_connections = False
+            for conn in elem.findall("connections"):
+                source_id = conn.get("source")
+                target_id = conn.get("target")
+
+                if source_id and target_id:
+                    found_connections = True
+                    source_name = get_name(source_id)
+                    if source_name is None:
+                        source_name = f"未知节点 (ID: {source_id})"
+                    target_name = get_name(target_id)
+                    if target_name is None:
+                        target_name = f"未知节点 (ID: {target_id})"
+
+                    # --- 修改的连接类型识别逻辑 ---
+                    conn_type = "Unknown"  # Default value
+
+                    # 优先级1: 检查 specific 'type' attribute (e.g., SysML.IBD.Connector)
+                    specific_type_attr = conn.get("type")
+                    if specific_type_attr == "SysML.IBD.Connector":
+                        conn_type = "Connector"
+                    else:
+                        # 优先级2: 检查 xmi:type 属性
+                        conn_xmi_type = conn.get(xmi_type_key)
+                        if conn_xmi_type:
+                            # Use the explicit xmi:type, e.g., "trufun:TModelElementConnection"
+                            conn_type = clean_connection_type(conn_xmi_type)
                         else:
-                            # 优先级2: 检查 xmi:type 属性
-                            conn_xmi_type = conn.get(
-                                f"{{{self.namespaces.get('xmi', '')}}}type"
-                            )
-                            if conn_xmi_type:
-                                # Use the explicit xmi:type, e.g., "trufun:TModelElementConnection"
-                                type_name = conn_xmi_type.split(":")[-1]
-                                conn_type = type_name.replace("T", "").replace(
-                                    "Connection", ""
-                                )
-                            else:
-                                # 优先级3: Fallback for safety (use tag name)
-                                conn_type = self._strip_ns(conn.tag)
-                        # --- 结束修改的连接类型识别逻辑 ---
+                            # 优先级3: Fallback for safety (use tag name without namespace)
+                            conn_type = conn.tag.rpartition("}")[2]
+                    # --- 结束修改的连接类型识别逻辑 ---
 
+                    if log_info:
                         logger.info(
                             f"  🔗 连接 ([blue]{conn_type}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]"
                         )
-                        # Store the triple for later use
-                        self.triples.append((source_name, conn_type, target_name))
+                    # Store the triple for later use
+                    yield (source_name, conn_type, target_name)
 
-                if not found_connections:
-                    logger.info("  ⚠️  未发现任何连接关系。")
+            if not found_connections:
+                logger.info("  ⚠️  未发现任何连接关系。")
 
     def extract_block_diagrams(self):
+        self.triples.extend(self.iter_block_triples())
+
+    def iter_block_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取块图。[/bold yellow]"
@@ -318,87 +541,67 @@ class SysMLParser:
 
         logger.info("\n📘 [bold blue]提取块图及其结构关系[/bold blue]")
 
-        # Iterate through all elements to find Block Diagrams
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # Find the diagram element
-            if tag == "contents" and elem.get("stereotype") == "SysmlBlockDiagram":
-                bdd_elem = elem
-                diagram_name = bdd_elem.get("name", "未命名块图")
-                logger.info(f"\n📊 分析块图: [bold]{diagram_name}[/bold]")
-
-                # --- 1. Extract all nodes (Blocks, ValueTypes, etc.) in this diagram ---
-                node_id_to_name = {}
-                for node in bdd_elem.findall(
-                    ".//nodes[@name]", namespaces=self.namespaces
-                ):
-                    node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                    node_name = node.get("name", "未命名节点").strip()
-
-                    if node_id:
-                        # Don't add compartment children to the main node list
-                        if node.get("type") == "ListCompartmentChild":
-                            continue
-                        node_id_to_name[node_id] = node_name
-                        logger.info(f"  🟢 节点: [green]{node_name}[/green]")
-
-                        # --- 1a. Extract value properties inside this node ---
-                        # Find the compartment for value properties
-                        value_props_compartment = node.find(
-                            "./nodes[@type='value_properties']",
-                            namespaces=self.namespaces,
-                        )
-                        if value_props_compartment is not None:
-                            for prop in value_props_compartment.findall(
-                                "./nodes[@type='ListCompartmentChild']",
-                                namespaces=self.namespaces,
-                            ):
-                                prop_name = prop.get("name", "未命名属性").strip()
-                                logger.info(f"    🔸 属性: [cyan]{prop_name}[/cyan]")
-
-                # --- 2. Extract and resolve connections within this diagram ---
-                found_connections = False
-                for conn in bdd_elem.findall(
-                    "./connections", namespaces=self.namespaces
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        # Iterate through the Block Diagrams indexed in load_xml
+        for elem in self._diagrams["block"]:
+            bdd_elem = elem
+            diagram_name = bdd_elem.get("name", "未命名块图")
+            logger.info("\n📊 分析块图: [bold]%s[/bold]", diagram_name)
+
+            # --- 1. Extract all nodes (Blocks, ValueTypes, etc.) in this diagram ---
+            # 连接只解析到本图中的节点，图外元素和值属性等分栏子项仍记为未知节点
+            node_id_to_name = {}
+            for node in bdd_elem.iter("nodes"):
+                node_id = node.get(xmi_id_key)
+                # Don't add compartment children to the main node list
+                if (
+                    not node_id
+                    or node.get("name") is None
+                    or node.get("type") == "ListCompartmentChild"
                 ):
-                    source_id = conn.get("source")
-                    target_id = conn.get("target")
-
-                    if source_id and target_id:
-                        found_connections = True
-                        source_name = node_id_to_name.get(
-                            source_id, f"未知节点 (ID: {source_id})"
-                        )
-                        target_name = node_id_to_name.get(
-                            target_id, f"未知节点 (ID: {target_id})"
-                        )
-
-                        conn_xmi_type = conn.get(
-                            f"{{{self.namespaces.get('xmi', '')}}}type"
-                        )
-                        if conn_xmi_type:
-                            # Use the explicit xmi:type, e.g., "trufun:TGeneralizeConnection"
-                            type_name = conn_xmi_type.split(":")[
-                                -1
-                            ]  # Becomes "TGeneralizeConnection"
-                            conn_type = type_name.replace("T", "").replace(
-                                "Connection", ""
-                            )  # Becomes "Generalize"
-                        else:
-                            # Fallback for safety
-                            conn_type = self._strip_ns(conn.tag)
+                    continue
+                node_name = names_get(node_id, "未命名节点")
+                node_id_to_name[node_id] = node_name
+                if log_info:
+                    logger.info(f"  🟢 节点: [green]{node_name}[/green]")
+
+                    # --- 1a. Extract value properties inside this node ---
+                    # Find the compartment for value properties
+                    value_props_compartment = next(
+                        (
+                            child
+                            for child in node.iterfind("nodes")
+                            if child.get("type") == "value_properties"
+                        ),
+                        None,
+                    )
+                    if value_props_compartment is not None:
+                        for prop in value_props_compartment.findall("nodes"):
+                            if prop.get("type") != "ListCompartmentChild":
+                                continue
+                            prop_name = prop.get("name", "未命名属性").strip()
+                            logger.info(f"    🔸 属性: [cyan]{prop_name}[/cyan]")
 
-                        logger.info(
-                            f"  🔗 关系 ([blue]{conn_type}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]"
-                        )
-                        # Store the triple for later use
-                        self.triples.append((source_name, conn_type, target_name))
+            # --- 2. Extract and resolve connections within this diagram ---
+            connection_triples = self._collect_connection_triples(
+                bdd_elem, node_id_to_name
+            )
+            if log_info:
+                for source_name, conn_type, target_name in connection_triples:
+                    logger.info(
+                        f"  🔗 关系 ([blue]{conn_type}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]"
+                    )
+            yield from connection_triples
 
-                if not found_connections:
-                    logger.info("  ⚠️  未发现任何连接关系。")
+            if not connection_triples:
+                logger.info("  ⚠️  未发现任何连接关系。")
 
     def extract_usecase_diagrams(self):
+        self.triples.extend(self.iter_usecase_triples())
+
+    def iter_usecase_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取用例图。[/bold yellow]"
@@ -407,95 +610,61 @@ class SysMLParser:
 
         logger.info("\n👤 [bold cyan]开始提取用例图及其参与者和用例关系[/bold cyan]")
 
-        # 遍历所有元素以查找用例图
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # 根据 xmi:type 属性找到用例图元素
-            if (
-                tag == "contents"
-                and elem.get(f"{{{self.namespaces.get('xmi', '')}}}type")
-                == "trufun:TUsecaseDiagram"
-            ):
-                usecase_diagram_elem = elem
-                diagram_name = usecase_diagram_elem.get("name", "未命名用例图")
-                logger.info(f"\n🎭 分析用例图: [bold]{diagram_name}[/bold]")
-
-                # --- 1. 提取所有用例节点和参与者节点 ---
-                node_id_to_name = {}
-                # 遍历图中的所有节点
-                for node in usecase_diagram_elem.findall(
-                    ".//nodes", namespaces=self.namespaces
-                ):
-                    node_xmi_type = node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
-                    )
-                    node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                    node_name = node.get("name", "未命名").strip()
-
-                    if node_id:
-                        if node_xmi_type == "trufun:TUseCaseNode":
-                            # 这是一个用例节点
-                            node_id_to_name[node_id] = node_name
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        xmi_type_key = self._xmi_type_key
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        # 遍历加载时已归类的用例图
+        for elem in self._diagrams["usecase"]:
+            usecase_diagram_elem = elem
+            diagram_name = usecase_diagram_elem.get("name", "未命名用例图")
+            logger.info("\n🎭 分析用例图: [bold]%s[/bold]", diagram_name)
+
+            # --- 1. 提取所有用例节点和参与者节点 ---
+            node_id_to_name = {}
+            # 遍历图中的所有节点
+            for node in usecase_diagram_elem.iter("nodes"):
+                node_xmi_type = node.get(xmi_type_key)
+                node_id = node.get(xmi_id_key)
+                node_name = names_get(node_id, "未命名")
+
+                if node_id:
+                    if node_xmi_type == "trufun:TUseCaseNode":
+                        # 这是一个用例节点
+                        node_id_to_name[node_id] = node_name
+                        if log_info:
                             logger.info(f"  ➡️ 用例: [green]{node_name}[/green]")
-                        elif (
-                            node_xmi_type == "trufun:TModelElementNode"
-                            and node.get("stereotype") == "<<block>>"
-                        ):
-                            # 根据提供的XML，参与者被建模为带有 <<block>> 构造型的 ModelElementNode
-                            node_id_to_name[node_id] = node_name
+                    elif (
+                        node_xmi_type == "trufun:TModelElementNode"
+                        and node.get("stereotype") == "<<block>>"
+                    ):
+                        # 根据提供的XML，参与者被建模为带有 <<block>> 构造型的 ModelElementNode
+                        node_id_to_name[node_id] = node_name
+                        if log_info:
                             logger.info(
                                 f"  🧍 参与者 (Block): [magenta]{node_name}[/magenta]"
                             )
-                        # 可以根据需要添加其他类型的节点，例如注释或超链接，但通常不将其添加到连接映射中。
-
-                # --- 2. 提取并解析连接关系 ---
-                found_connections = False
-                for conn in usecase_diagram_elem.findall(
-                    "./connections", namespaces=self.namespaces
-                ):
-                    source_id = conn.get("source")
-                    target_id = conn.get("target")
-
-                    if source_id and target_id:
-                        found_connections = True
-                        source_name = node_id_to_name.get(
-                            source_id, f"未知节点 (ID: {source_id})"
-                        )
-                        target_name = node_id_to_name.get(
-                            target_id, f"未知节点 (ID: {target_id})"
-                        )
-
-                        conn_xmi_type = conn.get(
-                            f"{{{self.namespaces.get('xmi', '')}}}type"
-                        )
-                        conn_type = "Unknown"
-                        if conn_xmi_type:
-                            type_name = conn_xmi_type.split(":")[
-                                -1
-                            ]  # 例如 "TAssociationConnection"
-                            # 特别处理用例图中常见的关联类型
-                            if type_name == "TAssociationConnection":
-                                conn_type = "Association"
-                            else:
-                                # Fallback to general cleaning if other types appear
-                                conn_type = type_name.replace("T", "").replace(
-                                    "Connection", ""
-                                )
-                        else:
-                            # Fallback for safety
-                            conn_type = self._strip_ns(conn.tag)
+                    # 可以根据需要添加其他类型的节点，例如注释或超链接，但通常不将其添加到连接映射中。
 
-                        logger.info(
-                            f"  🔗 关系 ([blue]{conn_type}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]"
-                        )
-                        # Store the triple for later use
-                        self.triples.append((source_name, conn_type, target_name))
+            # --- 2. 提取并解析连接关系 ---
+            # 关联连接 trufun:TAssociationConnection 经通用清理后即为 Association
+            connection_triples = self._collect_connection_triples(
+                usecase_diagram_elem, node_id_to_name
+            )
+            if log_info:
+                for source_name, conn_type, target_name in connection_triples:
+                    logger.info(
+                        f"  🔗 关系 ([blue]{conn_type}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]"
+                    )
+            yield from connection_triples
 
-                if not found_connections:
-                    logger.info("  ⚠️  未发现任何连接关系。")
+            if not connection_triples:
+                logger.info("  ⚠️  未发现任何连接关系。")
 
     def extract_activity_diagrams(self):
+        self.triples.extend(self.iter_activity_triples())
+
+    def iter_activity_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取活动图。[/bold yellow]"
@@ -504,106 +673,67 @@ class SysMLParser:
 
         logger.info("\n🏃 [bold yellow]开始提取活动图及其活动流[/bold yellow]")
 
-        # 遍历所有元素以查找活动图
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # 根据 xmi:type 属性找到活动图元素
-            if (
-                tag == "contents"
-                and elem.get(f"{{{self.namespaces.get('xmi', '')}}}type")
-                == "trufun:TActivityDiagram"
-            ):
-                activity_diagram_elem = elem
-                diagram_name = activity_diagram_elem.get("name", "未命名活动图")
-                logger.info(f"\n📊 分析活动图: [bold]{diagram_name}[/bold]")
-
-                node_id_to_name = {}
-
-                # Pass 1: Populate node_id_to_name map for all potential source/target IDs
-                for node in activity_diagram_elem.findall(
-                    ".//nodes", namespaces=self.namespaces
-                ):
-                    node_xmi_type = node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
-                    )
-                    node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                    node_name = node.get("name", "").strip()
-
-                    if node_id:
-                        display_name = node_name
-                        if node_xmi_type == "trufun:TInitialNode":
-                            display_name = "起始节点"
-                        elif node_xmi_type == "trufun:TActivityFinalNode":
-                            display_name = "活动终点"
-                        elif node_xmi_type == "trufun:TDecisionNode":
-                            display_name = "决策节点"
-                        elif node_xmi_type == "trufun:TActionNode":
-                            pass  # Use node_name directly
-                        elif node_xmi_type == "trufun:TInputPinNode":
-                            display_name = (
-                                f"输入引脚: {node_name.replace(':', '').strip()}"
-                                if node_name
-                                else "输入引脚"
-                            )
-                        elif node_xmi_type == "trufun:TOutputPinNode":
-                            display_name = (
-                                f"输出引脚: {node_name.replace(':', '').strip()}"
-                                if node_name
-                                else "输出引脚"
-                            )
-                        elif node_xmi_type == "trufun:TCommentNode":
-                            display_name = f"注释: {node_name}"
-                        elif node_xmi_type == "trufun:TCallBehaviorAction":
-                            display_name = f"调用行为: {node_name}"
-                        elif (
-                            node_xmi_type == "trufun:TSubjectNode"
-                        ):  # Activity Partition
-                            display_name = f"泳道: {node_name}"
-                        elif (
-                            node_xmi_type == "trufun:TActivityNode"
-                        ):  # Main Activity Node
-                            display_name = f"顶层活动: {node_name}"
-                        elif node_xmi_type == "trufun:SubLabel":
-                            continue  # Skip sublabels
-                        else:
-                            display_name = f"未知节点 ({self._strip_ns(node_xmi_type)}): {node_name if node_name else 'ID ' + node_id}"
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        xmi_type_key = self._xmi_type_key
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        # 遍历加载时已归类的活动图
+        for elem in self._diagrams["activity"]:
+            activity_diagram_elem = elem
+            diagram_name = activity_diagram_elem.get("name", "未命名活动图")
+            logger.info("\n📊 分析活动图: [bold]%s[/bold]", diagram_name)
+
+            node_id_to_name = {}
+
+            # Pass 1: Populate node_id_to_name map for all potential source/target IDs
+            # 结构日志（Pass 2）需要所有节点的显示名；不输出日志时只有连接端点会被查找，其余节点跳过
+            endpoint_ids = (
+                None if log_info else self._connection_endpoint_ids(activity_diagram_elem)
+            )
+            for node in activity_diagram_elem.iter("nodes"):
+                node_id = node.get(xmi_id_key)
+                if endpoint_ids is not None and node_id not in endpoint_ids:
+                    continue
+                node_xmi_type = node.get(xmi_type_key)
+                node_name = names_get(node_id, "")
+
+                if node_id:
+                    if node_xmi_type == "trufun:SubLabel":
+                        continue  # Skip sublabels
+                    if make_label := ACTIVITY_NODE_LABELS.get(node_xmi_type):
+                        display_name = make_label(node_name)
+                    else:
+                        display_name = f"未知节点 ({node_xmi_type}): {node_name if node_name else 'ID ' + node_id}"
 
-                        node_id_to_name[node_id] = display_name
+                    node_id_to_name[node_id] = display_name
 
-                # Pass 2: Log nodes in a more structured way, and extract internal behaviors
-                main_activity_node = activity_diagram_elem.find(
-                    f"./nodes[@{{{self.namespaces.get('xmi', '')}}}type='trufun:TActivityNode']",
-                    namespaces=self.namespaces,
+            # Pass 2: Log nodes in a more structured way, and extract internal behaviors
+            if log_info:
+                main_activity_node = next(
+                    (
+                        node
+                        for node in activity_diagram_elem.iterfind("nodes")
+                        if node.get(xmi_type_key) == "trufun:TActivityNode"
+                    ),
+                    None,
                 )
                 if main_activity_node is not None:
-                    main_activity_id = main_activity_node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}id"
-                    )
+                    main_activity_id = main_activity_node.get(xmi_id_key)
                     logger.info(
                         f"  📦 [bold green]{node_id_to_name.get(main_activity_id, '未知顶层活动')}[/bold green]"
                     )
 
-                    for partition in main_activity_node.findall(
-                        f"./nodes[@{{{self.namespaces.get('xmi', '')}}}type='trufun:TSubjectNode']",
-                        namespaces=self.namespaces,
-                    ):
-                        partition_id = partition.get(
-                            f"{{{self.namespaces.get('xmi', '')}}}id"
-                        )
+                    for partition in main_activity_node.findall("nodes"):
+                        if partition.get(xmi_type_key) != "trufun:TSubjectNode":
+                            continue
+                        partition_id = partition.get(xmi_id_key)
                         logger.info(
                             f"    ➡️ [bold blue]{node_id_to_name.get(partition_id, '未知泳道')}[/bold blue]"
                         )
 
-                        for sub_node in partition.findall(
-                            "./nodes", namespaces=self.namespaces
-                        ):
-                            sub_node_xmi_type = sub_node.get(
-                                f"{{{self.namespaces.get('xmi', '')}}}type"
-                            )
-                            sub_node_id = sub_node.get(
-                                f"{{{self.namespaces.get('xmi', '')}}}id"
-                            )
+                        for sub_node in partition.findall("nodes"):
+                            sub_node_xmi_type = sub_node.get(xmi_type_key)
+                            sub_node_id = sub_node.get(xmi_id_key)
                             if sub_node_xmi_type == "trufun:SubLabel":
                                 continue
 
@@ -628,75 +758,71 @@ class SysMLParser:
                                     f"      🔗 [underline blue]{sub_display_name}[/underline blue] (目标: {sub_node.get('extendData', '未知')})"
                                 )
 
-                # 4. 提取并解析连接关系 (控制流和对象流)
-                found_connections = False
-                for conn in activity_diagram_elem.findall(
-                    "./connections", namespaces=self.namespaces
-                ):
-                    source_id = conn.get("source")
-                    target_id = conn.get("target")
-
-                    if source_id and target_id:
-                        found_connections = True
-                        source_name = node_id_to_name.get(
-                            source_id, f"未知节点 (ID: {source_id})"
-                        )
-                        target_name = node_id_to_name.get(
-                            target_id, f"未知节点 (ID: {target_id})"
-                        )
-
-                        conn_xmi_type = conn.get(
-                            f"{{{self.namespaces.get('xmi', '')}}}type"
-                        )
-                        conn_type = "Unknown Flow"
-                        stereotype_attr = conn.get("stereotype")  # 例如 <<rate>>
-
-                        if stereotype_attr:
-                            conn_type = stereotype_attr.strip("<>")  # 优先使用构造型
-                        elif conn_xmi_type:
-                            type_name = conn_xmi_type.split(":")[-1]
-                            if type_name == "TControlFlowConnection":
-                                conn_type = "Control Flow"
-                            elif type_name == "TObjectFlowConnection":
-                                conn_type = "Object Flow"
-                            else:
-                                conn_type = type_name.replace("T", "").replace(
-                                    "Connection", ""
-                                )  # 通用清理
-
-                        # 检查是否有守卫条件 (guard condition)
-                        guard_condition = ""
-                        for sublabel in conn.findall(
-                            "./subLabels", namespaces=self.namespaces
-                        ):
-                            if sublabel.get("alias") == "Guard":
+            # 4. 提取并解析连接关系 (控制流和对象流)
+            get_name = node_id_to_name.get
+            found_connections = False
+            for conn in activity_diagram_elem.findall("connections"):
+                source_id = conn.get("source")
+                target_id = conn.get("target")
+
+                if source_id and target_id:
+                    found_connections = True
+                    source_name = get_name(source_id)
+                    if source_name is None:
+                        source_name = f"未知节点 (ID: {source_id})"
+                    target_name = get_name(target_id)
+                    if target_name is None:
+                        target_name = f"未知节点 (ID: {target_id})"
+
+                    conn_xmi_type = conn.get(xmi_type_key)
+                    conn_type = "Unknown Flow"
+                    stereotype_attr = conn.get("stereotype")  # 例如 <<rate>>
+
+                    if stereotype_attr:
+                        conn_type = stereotype_attr.strip("<>")  # 优先使用构造型
+                    elif conn_xmi_type:
+                        type_name = conn_xmi_type.split(":")[-1]
+                        if type_name == "TControlFlowConnection":
+                            conn_type = "Control Flow"
+                        elif type_name == "TObjectFlowConnection":
+                            conn_type = "Object Flow"
+                        else:
+                            conn_type = clean_connection_type(conn_xmi_type)  # 通用清理
+
+                    # 一次遍历 subLabels，同时提取守卫条件 (guard condition) 和构造型
+                    guard_condition = ""
+                    stereotype_names = []  # 补充的构造型名称，扫描结束后一次性拼接
+                    for sublabel in conn.findall("subLabels"):
+                        alias = sublabel.get("alias")
+                        if alias == "Guard":
+                            if not guard_condition:  # 假设每个流只有一个守卫条件，取第一个
                                 guard_condition = (
                                     f" [{sublabel.get('name', '').strip()}]"
                                 )
-                                break  # 假设每个流只有一个守卫条件
-
-                        # 检查是否有构造型（如果没有在stereotype属性中，可能在subLabels中）
-                        # 确保不重复添加已从stereotype属性获取的构造型
-                        if not stereotype_attr:
-                            for sublabel in conn.findall(
-                                "./subLabels", namespaces=self.namespaces
-                            ):
-                                if sublabel.get("alias") == "Stereotype":
-                                    name = sublabel.get("name")
-                                    if name not in [None, "", conn_type]:
-                                        if name is not None:
-                                            conn_type += f" {name.strip().strip('<>')}"
-
+                                if stereotype_attr:
+                                    break  # 构造型已由属性给出，无需继续扫描
+                        elif alias == "Stereotype" and not stereotype_attr:
+                            # 构造型不在stereotype属性中时才从subLabels中补充，避免重复添加
+                            name = sublabel.get("name")
+                            if name not in [None, "", conn_type]:
+                                stereotype_names.append(name.strip().strip("<>"))
+                    if stereotype_names:
+                        conn_type = " ".join([conn_type, *stereotype_names])
+
+                    if log_info:
                         logger.info(
                             f"    🔗 关系 ([blue]{conn_type}{guard_condition}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]"
                         )
-                        # Store the triple for later use
-                        self.triples.append((source_name, conn_type, target_name))
+                    # Store the triple for later use
+                    yield (source_name, conn_type, target_name)
 
-                if not found_connections:
-                    logger.info("  ⚠️  未发现任何连接关系。")
+            if not found_connections:
+                logger.info("  ⚠️  未发现任何连接关系。")
 
     def extract_class_diagrams(self):
+        self.triples.extend(self.iter_class_triples())
+
+    def iter_class_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取类图。[/bold yellow]"
@@ -705,166 +831,118 @@ class SysMLParser:
 
         logger.info("\n📚 [bold yellow]开始提取类图及其结构和关系[/bold yellow]")
 
-        # 遍历所有元素以查找类图
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # 根据 xmi:type 属性找到类图元素
-            # 假设类图的 xmi:type 是 trufun:TClassDiagram
-            if (
-                tag == "contents"
-                and elem.get(f"{{{self.namespaces.get('xmi', '')}}}type")
-                == "trufun:TClassDiagram"
-            ):
-                class_diagram_elem = elem
-                diagram_name = class_diagram_elem.get("name", "未命名类图")
-                logger.info(f"\n🧩 分析类图: [bold]{diagram_name}[/bold]")
-
-                node_id_to_name = {}
-                # --- MODIFIED: Broaden node identification criteria ---
-                for node in class_diagram_elem.findall(
-                    ".//nodes", namespaces=self.namespaces
-                ):
-                    node_xmi_type = node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        xmi_type_key = self._xmi_type_key
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        # 遍历加载时已归类的类图
+        for elem in self._diagrams["class"]:
+            class_diagram_elem = elem
+            diagram_name = class_diagram_elem.get("name", "未命名类图")
+            logger.info("\n🧩 分析类图: [bold]%s[/bold]", diagram_name)
+
+            node_id_to_name = {}
+            # --- MODIFIED: Broaden node identification criteria ---
+            for node in class_diagram_elem.iter("nodes"):
+                # Identify nodes that represent entities in the diagram
+                # This now includes TClassNode, TModelElementNode (for blocks/requirements), etc.
+                # 先按类型过滤，再检查名称，非实体节点不再读取 ID 和名称
+                node_xmi_type = node.get(xmi_type_key)
+                if node_xmi_type not in CLASS_ENTITY_NODE_TYPES:
+                    continue
+                # For TModelElementNode, the 'name' attribute directly holds the entity name.
+                # For TCommentNode, it also has a 'name' attribute.
+                node_id = node.get(xmi_id_key)
+                node_name = names_get(node_id, "")  # 没有 ID 的节点同样得到空名称
+                if not node_name:  # Ensure name is not empty
+                    continue
+                node_id_to_name[node_id] = node_name
+                if not log_info:
+                    continue
+
+                # Log only if it's a primary entity type
+                if node_xmi_type in CLASS_PRIMARY_NODE_TYPES:
+                    logger.info(
+                        f"  🔷 实体: [green]{node_name}[/green] (类型: {node_xmi_type}, Stereotype: {node.get('stereotype', '无')})"
                     )
-                    node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                    node_name = node.get(
-                        "name", ""
-                    ).strip()  # Use empty string for initial check
-
-                    # Identify nodes that represent entities in the diagram
-                    # This now includes TClassNode, TModelElementNode (for blocks/requirements), etc.
-                    if node_id and (
-                        node_xmi_type == "trufun:TClassNode"
-                        or node_xmi_type
-                        == "trufun:TModelElementNode"  # Capture all TModelElementNodes
-                        or node_xmi_type
-                        == "trufun:TCommentNode"  # Capture Comment Nodes like HyperLink
+                else:  # trufun:TCommentNode
+                    logger.info(
+                        f"  📝 注释/链接: [green]{node_name}[/green] (类型: {node_xmi_type})"
+                    )
+
+                # 一次遍历子节点，找出各类分栏（每类取第一个），再按 CLASS_COMPARTMENTS 的顺序输出
+                compartments = {}
+                for child in node.findall("nodes"):
+                    compartment_type = child.get("type")
+                    if (
+                        compartment_type in CLASS_COMPARTMENTS
+                        and compartment_type not in compartments
                     ):
-                        # For TModelElementNode, the 'name' attribute directly holds the entity name.
-                        # For TCommentNode, it also has a 'name' attribute.
-                        if node_name:  # Ensure name is not empty
-                            node_id_to_name[node_id] = node_name
-                            # Log only if it's a primary entity type
-                            if node_xmi_type in [
-                                "trufun:TClassNode",
-                                "trufun:TModelElementNode",
-                            ]:
-                                logger.info(
-                                    f"  🔷 实体: [green]{node_name}[/green] (类型: {self._strip_ns(node_xmi_type)}, Stereotype: {node.get('stereotype', '无')})"
-                                )
-                            elif node_xmi_type == "trufun:TCommentNode":
-                                logger.info(
-                                    f"  📝 注释/链接: [green]{node_name}[/green] (类型: {self._strip_ns(node_xmi_type)})"
-                                )
-                        else:
+                        compartments[compartment_type] = child
+                for compartment_type, (
+                    label,
+                    color,
+                    default_name,
+                ) in CLASS_COMPARTMENTS.items():
+                    compartment = compartments.get(compartment_type)
+                    if compartment is None:
+                        continue
+                    for item in compartment.findall("nodes"):
+                        if item.get("type") != "ListCompartmentChild":
                             continue
+                        item_name = item.get("name", default_name).strip()
+                        logger.info(f"    - {label}: [{color}]{item_name}[/{color}]")
+
+            # --- 2. 提取并解析连接关系 ---
+            get_name = node_id_to_name.get
+            found_connections = False
+            for conn in class_diagram_elem.findall("connections"):
+                source_id = conn.get("source")
+                target_id = conn.get("target")
+
+                if source_id and target_id:
+                    found_connections = True
+                    source_name = get_name(source_id)
+                    if source_name is None:
+                        source_name = f"未知节点 (ID: {source_id})"
+                    target_name = get_name(target_id)
+                    if target_name is None:
+                        target_name = f"未知节点 (ID: {target_id})"
+
+                    conn_xmi_type = conn.get(xmi_type_key)
+                    conn_type = "Unknown Relationship"
+                    stereotype_attr = conn.get("stereotype")
+
+                    if stereotype_attr:
+                        conn_type = stereotype_attr.strip("<>")
+                    elif conn_xmi_type:
+                        type_name = conn_xmi_type.split(":")[-1]
+                        # 常见类图连接类型
+                        if type_name == "TAssociationConnection":
+                            conn_type = "Association"
+                        elif type_name == "TGeneralizeConnection":
+                            conn_type = "Generalization"
+                        elif type_name == "TRealizeConnection":  # Realization
+                            conn_type = "Realization"
+                        elif type_name == "TDependencyConnection":  # Dependency
+                            conn_type = "Dependency"
+                        else:
+                            conn_type = clean_connection_type(conn_xmi_type)
 
-                        part_properties_compartment = node.find(
-                            "./nodes[@type='part_properties']",
-                            namespaces=self.namespaces,
-                        )
-                        if part_properties_compartment is not None:
-                            for part_prop in part_properties_compartment.findall(
-                                "./nodes[@type='ListCompartmentChild']",
-                                namespaces=self.namespaces,
-                            ):
-                                part_name = part_prop.get("name", "未命名部件").strip()
-                                logger.info(f"    - 部件属性: [cyan]{part_name}[/cyan]")
-
-                        constraint_properties_compartment = node.find(
-                            "./nodes[@type='constraint_properties']",
-                            namespaces=self.namespaces,
-                        )
-                        if constraint_properties_compartment is not None:
-                            for (
-                                constraint_prop
-                            ) in constraint_properties_compartment.findall(
-                                "./nodes[@type='ListCompartmentChild']",
-                                namespaces=self.namespaces,
-                            ):
-                                constraint_name = constraint_prop.get(
-                                    "name", "未命名约束"
-                                ).strip()
-                                logger.info(
-                                    f"    - 约束属性: [cyan]{constraint_name}[/cyan]"
-                                )
-
-                        # Original attribute/operation extraction (might be less relevant for your SysML-like XML)
-                        attrs_compartment = node.find(
-                            "./nodes[@type='attributes']", namespaces=self.namespaces
-                        )
-                        if attrs_compartment is not None:
-                            for prop in attrs_compartment.findall(
-                                "./nodes[@type='ListCompartmentChild']",
-                                namespaces=self.namespaces,
-                            ):
-                                prop_name = prop.get("name", "未命名属性").strip()
-                                logger.info(f"    - 属性: [cyan]{prop_name}[/cyan]")
-
-                        ops_compartment = node.find(
-                            "./nodes[@type='operations']", namespaces=self.namespaces
-                        )
-                        if ops_compartment is not None:
-                            for op in ops_compartment.findall(
-                                "./nodes[@type='ListCompartmentChild']",
-                                namespaces=self.namespaces,
-                            ):
-                                op_name = op.get("name", "未命名操作").strip()
-                                logger.info(f"    - 操作: [purple]{op_name}[/purple]")
-
-                # --- 2. 提取并解析连接关系 ---
-                found_connections = False
-                for conn in class_diagram_elem.findall(
-                    "./connections", namespaces=self.namespaces
-                ):
-                    source_id = conn.get("source")
-                    target_id = conn.get("target")
-
-                    if source_id and target_id:
-                        found_connections = True
-                        source_name = node_id_to_name.get(
-                            source_id, f"未知节点 (ID: {source_id})"
-                        )
-                        target_name = node_id_to_name.get(
-                            target_id, f"未知节点 (ID: {target_id})"
-                        )
-
-                        conn_xmi_type = conn.get(
-                            f"{{{self.namespaces.get('xmi', '')}}}type"
-                        )
-                        conn_type = "Unknown Relationship"
-                        stereotype_attr = conn.get("stereotype")
-
-                        if stereotype_attr:
-                            conn_type = stereotype_attr.strip("<>")
-                        elif conn_xmi_type:
-                            type_name = conn_xmi_type.split(":")[-1]
-                            # 常见类图连接类型
-                            if type_name == "TAssociationConnection":
-                                conn_type = "Association"
-                            elif type_name == "TGeneralizeConnection":
-                                conn_type = "Generalization"
-                            elif type_name == "TRealizeConnection":  # Realization
-                                conn_type = "Realization"
-                            elif type_name == "TDependencyConnection":  # Dependency
-                                conn_type = "Dependency"
-                            else:
-                                conn_type = type_name.replace("T", "").replace(
-                                    "Connection", ""
-                                )
-
+                    if log_info:
                         logger.info(
                             f"  🔗 关系 ([blue]{conn_type}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]"
                         )
-                        # Store the triple for later use
-                        self.triples.append((source_name, conn_type, target_name))
+                    # Store the triple for later use
+                    yield (source_name, conn_type, target_name)
 
-                if not found_connections:
-                    logger.info("  ⚠️  未发现任何连接关系。")
+            if not found_connections:
+                logger.info("  ⚠️  未发现任何连接关系。")
 
     def extract_state_machine_diagrams(self):
+        self.triples.extend(self.iter_state_machine_triples())
+
+    def iter_state_machine_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取状态机图。[/bold yellow]"
@@ -873,233 +951,210 @@ class SysMLParser:
 
         logger.info("\n⚙️ [bold blue]开始提取状态机图及其状态转换[/bold blue]")
 
-        # 遍历所有元素以查找状态机图
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # 根据 xmi:type 和 stereotype 属性找到状态机图元素
-            if (
-                tag == "contents"
-                and elem.get(f"{{{self.namespaces.get('xmi', '')}}}type")
-                == "trufun:TStateMachineDiagram"
-                and elem.get("stereotype") == "SysMLStateDiagram"
-            ):
-                state_machine_diagram_elem = elem
-                diagram_name = state_machine_diagram_elem.get("name", "未命名状态机图")
-                logger.info(f"\n🌀 分析状态机图: [bold]{diagram_name}[/bold]")
-
-                node_id_to_name = {}
-
-                # Pass 1: Populate node_id_to_name map for all potential source/target IDs
-                # This helps in resolving connections even if nodes are deeply nested.
-                for node in state_machine_diagram_elem.findall(
-                    ".//nodes", namespaces=self.namespaces
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        xmi_type_key = self._xmi_type_key
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        # 遍历加载时已归类的状态机图
+        for elem in self._diagrams["state_machine"]:
+            state_machine_diagram_elem = elem
+            diagram_name = state_machine_diagram_elem.get("name", "未命名状态机图")
+            logger.info("\n🌀 分析状态机图: [bold]%s[/bold]", diagram_name)
+
+            node_id_to_name = {}
+
+            # 结构日志（Pass 2）需要所有节点的显示名；不输出日志时只有转换的端点会被查找，
+            # 先收集端点ID，Pass 1 跳过其余节点，不再为它们读取属性和构造显示名
+            endpoint_ids = None
+            if not log_info:
+                endpoint_ids = self._connection_endpoint_ids(state_machine_diagram_elem)
+
+            # Pass 1: Populate node_id_to_name map for all potential source/target IDs
+            # This helps in resolving connections even if nodes are deeply nested.
+            for node in state_machine_diagram_elem.iter("nodes"):
+                node_id = node.get(xmi_id_key)
+                if not node_id or (
+                    endpoint_ids is not None and node_id not in endpoint_ids
                 ):
-                    node_xmi_type = node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
-                    )
-                    node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                    node_name = node.get(
-                        "name", ""
-                    ).strip()  # Name might be empty for choice nodes
-
-                    if node_id:
-                        display_name = node_name
-                        if node_xmi_type == "trufun:TStateMachineNode":
-                            display_name = (
-                                f"状态机: {node_name if node_name else '未命名'}"
-                            )
-                        elif node_xmi_type == "trufun:TRegionNode":
-                            display_name = (
-                                f"区域: {node_name if node_name else '未命名'}"
-                            )
-                        elif node_xmi_type == "trufun:TInitialStateNode":
-                            display_name = "初始状态"
-                        elif node_xmi_type == "trufun:TFinalStateNode":
-                            display_name = "最终状态"  # Not in provided XML, but common
-                        elif node_xmi_type == "trufun:TCompositeStateNode":
-                            display_name = (
-                                f"状态: {node_name if node_name else '未命名'}"
-                            )
-                        elif node_xmi_type == "trufun:TChoiceStateNode":
-                            display_name = "选择伪状态"
-                        elif (
-                            node_xmi_type == "trufun:TJoinStateNode"
-                        ):  # Not in provided XML
-                            display_name = "连接伪状态"
-                        elif (
-                            node_xmi_type == "trufun:TForkStateNode"
-                        ):  # Not in provided XML
-                            display_name = "分叉伪状态"
-                        elif (
-                            node_xmi_type == "trufun:TEntryPointNode"
-                        ):  # Not in provided XML
-                            display_name = "入口点伪状态"
-                        elif (
-                            node_xmi_type == "trufun:TExitPointNode"
-                        ):  # Not in provided XML
-                            display_name = "出口点伪状态"
-                        elif (
-                            node_xmi_type == "trufun:TCommentNode"
-                            and node.get("type") == "HyperLink"
-                        ):
-                            display_name = f"超链接: {node_name}"
-                        elif node_xmi_type == "trufun:SubLabel":
-                            continue  # Skip sub-labels for the main map
-                        else:
-                            display_name = f"未知节点 ({self._strip_ns(node_xmi_type)}): {node_name if node_name else 'ID ' + node_id}"
-
-                        node_id_to_name[node_id] = display_name
-
-                # Pass 2: Log nodes in a more structured way, and extract internal behaviors
-                # Find the main state machine node (should be only one per diagram)
-                main_state_machine_node = state_machine_diagram_elem.find(
-                    f"./nodes[@{{{self.namespaces.get('xmi', '')}}}type='trufun:TStateMachineNode']",
-                    namespaces=self.namespaces,
+                    continue
+                node_xmi_type = node.get(xmi_type_key)
+                if node_xmi_type == "trufun:SubLabel":
+                    continue  # Skip sub-labels for the main map
+                node_name = names_get(node_id, "")  # Name might be empty for choice nodes
+
+                if make_label := STATE_MACHINE_NODE_LABELS.get(node_xmi_type):
+                    display_name = make_label(node_name)
+                elif (
+                    node_xmi_type == "trufun:TCommentNode"
+                    and node.get("type") == "HyperLink"
+                ):
+                    display_name = f"超链接: {node_name}"
+                else:
+                    display_name = f"未知节点 ({node_xmi_type}): {node_name if node_name else 'ID ' + node_id}"
+
+                node_id_to_name[node_id] = display_name
+
+            # Pass 2: Log nodes in a more structured way, and extract internal behaviors
+            # Find the main state machine node (should be only one per diagram)
+            if log_info:
+                main_state_machine_node = next(
+                    (
+                        node
+                        for node in state_machine_diagram_elem.iterfind("nodes")
+                        if node.get(xmi_type_key) == "trufun:TStateMachineNode"
+                    ),
+                    None,
                 )
 
                 if main_state_machine_node is not None:
-                    main_sm_id = main_state_machine_node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}id"
-                    )
+                    main_sm_id = main_state_machine_node.get(xmi_id_key)
                     logger.info(
                         f"  ⚙️ [bold green]{node_id_to_name.get(main_sm_id, '未知状态机')}[/bold green]"
                     )
 
-                    # Recursively process regions and states
-                    def process_region_content(parent_node, indent_level=0):
+                    # 用显式栈按文档顺序深度优先遍历区域和状态，代替逐层递归
+                    # 栈中每项为 (子节点迭代器, 缩进层级, 是否为复合状态下的子区域列表)
+                    # Start with indent level 1 for the content of the region(s)
+                    # directly under the main state machine node
+                    stack = [
+                        (iter(region_node.findall("nodes")), 1, False)
+                        for region_node in reversed(
+                            [
+                                node
+                                for node in main_state_machine_node.findall("nodes")
+                                if node.get(xmi_type_key) == "trufun:TRegionNode"
+                            ]
+                        )
+                    ]
+                    while stack:
+                        children, indent_level, is_sub_regions = stack[-1]
+                        node = next(children, None)
+                        if node is None:
+                            stack.pop()
+                            continue
                         indent = "  " * indent_level
-                        for node in parent_node.findall(
-                            "./nodes", namespaces=self.namespaces
-                        ):  # Direct children within the region/composite state
-                            node_xmi_type = node.get(
-                                f"{{{self.namespaces.get('xmi', '')}}}type"
+
+                        if is_sub_regions:
+                            # Nested region within a composite state: log it, then descend
+                            sub_region_id = node.get(xmi_id_key)
+                            logger.info(
+                                f"{indent}  {indent}📦 {node_id_to_name.get(sub_region_id, '未知区域')}"
                             )
-                            node_id = node.get(
-                                f"{{{self.namespaces.get('xmi', '')}}}id"
+                            stack.append(
+                                (iter(node.findall("nodes")), indent_level + 2, False)
                             )
+                            continue
 
-                            if node_xmi_type == "trufun:SubLabel":
-                                continue  # Skip display labels
+                        # Direct children within the region/composite state
+                        node_xmi_type = node.get(xmi_type_key)
+                        node_id = node.get(xmi_id_key)
 
-                            display_name = node_id_to_name.get(
-                                node_id, f"未知 ({node_id})"
-                            )
+                        if node_xmi_type == "trufun:SubLabel":
+                            continue  # Skip display labels
 
-                            if node_xmi_type == "trufun:TRegionNode":
-                                logger.info(f"{indent}  📦 {display_name}")
-                                process_region_content(
-                                    node, indent_level + 1
-                                )  # Recurse into sub-region
-                            elif node_xmi_type == "trufun:TCompositeStateNode":
-                                logger.info(f"{indent}  🟡 {display_name}")
-                                # Check for internal activities (Entry, Exit, Do)
-                                internet_compartment = node.find(
-                                    "./internetPartCompartment",
-                                    namespaces=self.namespaces,
-                                )
-                                if internet_compartment is not None:
-                                    for internal_part in internet_compartment.findall(
-                                        "./internelParts", namespaces=self.namespaces
-                                    ):
-                                        activity_name = internal_part.get(
-                                            "name", "未命名活动"
-                                        ).strip()
-                                        is_do_activity = (
-                                            internal_part.get("isDo") == "true"
-                                        )
-                                        behavior_type = (
-                                            "Do" if is_do_activity else "Internal"
-                                        )
-                                        logger.info(
-                                            f"{indent}    🔹 {behavior_type} Activity: [cyan]{activity_name}[/cyan]"
-                                        )
-                                # Check for nested regions within composite state
-                                for sub_region in node.findall(
-                                    f"./nodes[@{{{self.namespaces.get('xmi', '')}}}type='trufun:TRegionNode']",
-                                    namespaces=self.namespaces,
+                        display_name = node_id_to_name.get(node_id, f"未知 ({node_id})")
+
+                        if node_xmi_type == "trufun:TRegionNode":
+                            logger.info(f"{indent}  📦 {display_name}")
+                            # Descend into sub-region
+                            stack.append(
+                                (iter(node.findall("nodes")), indent_level + 1, False)
+                            )
+                        elif node_xmi_type == "trufun:TCompositeStateNode":
+                            logger.info(f"{indent}  🟡 {display_name}")
+                            # Check for internal activities (Entry, Exit, Do)
+                            internet_compartment = node.find("internetPartCompartment")
+                            if internet_compartment is not None:
+                                for internal_part in internet_compartment.findall(
+                                    "internelParts"
                                 ):
-                                    sub_region_id = sub_region.get(
-                                        f"{{{self.namespaces.get('xmi', '')}}}id"
-                                    )
+                                    activity_name = internal_part.get(
+                                        "name", "未命名活动"
+                                    ).strip()
+                                    is_do_activity = internal_part.get("isDo") == "true"
+                                    behavior_type = "Do" if is_do_activity else "Internal"
                                     logger.info(
-                                        f"{indent}  {indent}📦 {node_id_to_name.get(sub_region_id, '未知区域')}"
+                                        f"{indent}    🔹 {behavior_type} Activity: [cyan]{activity_name}[/cyan]"
                                     )
-                                    process_region_content(
-                                        sub_region, indent_level + 2
-                                    )  # Recurse into nested region
-                            elif node_xmi_type == "trufun:TInitialStateNode":
-                                logger.info(f"{indent}  ➡️ {display_name}")
-                            elif node_xmi_type == "trufun:TChoiceStateNode":
-                                logger.info(f"{indent}  ❓ {display_name}")
-                            elif (
-                                node_xmi_type == "trufun:TCommentNode"
-                                and node.get("type") == "HyperLink"
-                            ):
-                                logger.info(
-                                    f"{indent}  🔗 [underline blue]{display_name}[/underline blue] (目标: {node.get('extendData', '未知')})"
+                            # Nested regions within the composite state come next
+                            stack.append(
+                                (
+                                    (
+                                        region_node
+                                        for region_node in node.findall("nodes")
+                                        if region_node.get(xmi_type_key)
+                                        == "trufun:TRegionNode"
+                                    ),
+                                    indent_level,
+                                    True,
                                 )
-                            else:  # Other simple states or pseudostates
-                                logger.info(f"{indent}  ⚪ {display_name}")
-
-                    # Start processing from the region(s) directly under the main state machine node
-                    for region_node in main_state_machine_node.findall(
-                        f"./nodes[@{{{self.namespaces.get('xmi', '')}}}type='trufun:TRegionNode']",
-                        namespaces=self.namespaces,
-                    ):
-                        process_region_content(
-                            region_node, 1
-                        )  # Start with indent level 1 for main region's content
-
-                # 3. Extract and resolve transitions (connections)
-                found_transitions = False
-                for conn in state_machine_diagram_elem.findall(
-                    "./connections", namespaces=self.namespaces
-                ):
-                    source_id = conn.get("source")
-                    target_id = conn.get("target")
-
-                    if source_id and target_id:
-                        found_transitions = True
-                        source_name = node_id_to_name.get(
-                            source_id, f"未知节点 (ID: {source_id})"
-                        )
-                        target_name = node_id_to_name.get(
-                            target_id, f"未知节点 (ID: {target_id})"
-                        )
-
-                        _ = conn.get(f"{{{self.namespaces.get('xmi', '')}}}type")
-                        transition_type = (
-                            "Transition"  # Default for TTransitionConnection
-                        )
+                            )
+                        elif (
+                            node_xmi_type == "trufun:TCommentNode"
+                            and node.get("type") == "HyperLink"
+                        ):
+                            logger.info(
+                                f"{indent}  🔗 [underline blue]{display_name}[/underline blue] (目标: {node.get('extendData', '未知')})"
+                            )
+                        else:  # Simple states or pseudostates, icon looked up by type
+                            icon = STATE_MACHINE_NODE_ICONS.get(node_xmi_type, "⚪")
+                            logger.info(f"{indent}  {icon} {display_name}")
+
+            # 3. Extract and resolve transitions (connections)
+            get_name = node_id_to_name.get
+            found_transitions = False
+            for conn in state_machine_diagram_elem.findall("connections"):
+                source_id = conn.get("source")
+                target_id = conn.get("target")
+
+                if source_id and target_id:
+                    found_transitions = True
+                    source_name = get_name(source_id)
+                    if source_name is None:
+                        source_name = f"未知节点 (ID: {source_id})"
+                    target_name = get_name(target_id)
+                    if target_name is None:
+                        target_name = f"未知节点 (ID: {target_id})"
+
+                    _ = conn.get(xmi_type_key)
+                    transition_type = (
+                        "Transition"  # Default for TTransitionConnection
+                    )
 
-                        # Transition label (Event[Guard]/Effect)
+                    if log_info:
+                        # Transition label (Event[Guard]/Effect)，只用于日志输出
                         transition_label = conn.get("name", "").strip()
                         # Often, the 'name' attribute contains the guard/event
                         # But also check subLabels for 'Guard' or 'Name' alias for robustness
-                        for sublabel in conn.findall(
-                            "./subLabels", namespaces=self.namespaces
-                        ):
-                            if sublabel.get("alias") in ["Name", "Guard"]:
+                        # 补充的标签先收集，扫描结束后一次性拼接
+                        label_details = []
+                        for sublabel in conn.findall("subLabels"):
+                            if sublabel.get("alias") in {"Name", "Guard"}:
                                 sublabel_text = sublabel.get("name", "").strip()
                                 if (
                                     sublabel_text and sublabel_text != transition_label
                                 ):  # Avoid duplicating if already in 'name'
                                     if transition_label:
-                                        transition_label += f" ({sublabel_text})"
+                                        label_details.append(f"({sublabel_text})")
                                     else:
                                         transition_label = sublabel_text
-
+                        if label_details:
+                            transition_label = " ".join(
+                                [transition_label, *label_details]
+                            )
                         logger.info(
                             f"    🔗 {transition_type}: [bold green]{source_name}[/bold green] --({transition_label})--> [bold blue]{target_name}[/bold blue]"
                         )
-                        # Store the triple for later use
-                        self.triples.append((source_name, transition_type, target_name))
+                    # Store the triple for later use
+                    yield (source_name, transition_type, target_name)
 
-                if not found_transitions:
-                    logger.info("    ⚠️  未发现任何转换关系。")
+            if not found_transitions:
+                logger.info("    ⚠️  未发现任何转换关系。")
 
     def extract_sequence_diagrams(self):
+        self.triples.extend(self.iter_sequence_triples())
+
+    def iter_sequence_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取序列图。[/bold yellow]"
@@ -1108,193 +1163,176 @@ class SysMLParser:
 
         logger.info("\n➡️ [bold cyan]开始提取序列图及其交互和消息[/bold cyan]")
 
-        # 遍历所有元素以查找序列图
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # 根据 xmi:type 和 stereotype 属性找到序列图元素
-            if (
-                tag == "contents"
-                and elem.get(f"{{{self.namespaces.get('xmi', '')}}}type")
-                == "trufun:TSequenceDiagram"
-                and elem.get("stereotype") == "SysMLSequenceDiagram"
-            ):
-                seq_diagram_elem = elem
-                diagram_name = seq_diagram_elem.get("name", "未命名序列图")
-                logger.info(f"\n💬 分析序列图: [bold]{diagram_name}[/bold]")
-
-                # 查找序列图中的主要交互节点
-                interaction_node = seq_diagram_elem.find(
-                    f"./nodes[@{{{self.namespaces.get('xmi', '')}}}type='trufun:TInteractionNode']",
-                    namespaces=self.namespaces,
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        model_names_get = self._model_elements_by_id.get  # 全局模型元素名称
+        xmi_type_key = self._xmi_type_key
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        # 遍历加载时已归类的序列图
+        for elem in self._diagrams["sequence"]:
+            seq_diagram_elem = elem
+            diagram_name = seq_diagram_elem.get("name", "未命名序列图")
+            logger.info("\n💬 分析序列图: [bold]%s[/bold]", diagram_name)
+
+            # 查找序列图中的主要交互节点
+            interaction_node = next(
+                (
+                    node
+                    for node in seq_diagram_elem.iterfind("nodes")
+                    if node.get(xmi_type_key) == "trufun:TInteractionNode"
+                ),
+                None,
+            )
+
+            # --- 关键修改：只有找到 interaction_node 才继续处理 ---
+            if interaction_node is None:
+                logger.warning(
+                    "  ⚠️  在序列图 '[bold]%s[/bold]' 中未找到主要交互节点，跳过此图。",
+                    diagram_name,
                 )
+                continue  # 如果没有找到交互节点，则跳过当前序列图，继续下一个
 
-                # --- 关键修改：只有找到 interaction_node 才继续处理 ---
-                if interaction_node is None:
-                    logger.warning(
-                        f"  ⚠️  在序列图 '[bold]{diagram_name}[/bold]' 中未找到主要交互节点，跳过此图。"
-                    )
-                    continue  # 如果没有找到交互节点，则跳过当前序列图，继续下一个
+            logger.info(
+                "  ↔️ 交互: [bold green]%s[/bold green]",
+                interaction_node.get("name", "未命名交互"),
+            )
 
-                logger.info(
-                    f"  ↔️ 交互: [bold green]{interaction_node.get('name', '未命名交互')}[/bold green]"
-                )
+            # --- Pass 1: Collect all relevant nodes and their associations ---
+            # This map will store the display name for any node with an xmi:id
+            diagram_node_map = {}
+            # This map traces TEventOccurrenceNode IDs back to their parent lifeline ID
+            event_occurrence_to_lifeline_id_map = {}
+
+            # 消息连接只筛选一次，端点收集和后面的消息提取共用这个列表
+            message_conns = [
+                conn
+                for conn in seq_diagram_elem.findall("connections")
+                if conn.get(xmi_type_key) == "trufun:TMessageConnection_SD"
+            ]
+
+            # 结构日志需要所有节点的显示名；不输出日志时消息只经事件映射查找生命线名称，
+            # 先收集消息端点ID，遍历时只记录生命线名称和端点事件，其余节点不再构造显示名
+            endpoint_ids = None
+            if not log_info:
+                endpoint_ids = {
+                    endpoint_id
+                    for conn in message_conns
+                    for endpoint_id in (conn.get("source"), conn.get("target"))
+                }
 
-                # --- Pass 1: Collect all relevant nodes and their associations ---
-                # This map will store the display name for any node with an xmi:id
-                diagram_node_map = {}
-                # This map traces TEventOccurrenceNode IDs back to their parent lifeline ID
-                event_occurrence_to_lifeline_id_map = {}
-
-                # Recursive helper to traverse the nested nodes in sequence diagram
-                def collect_seq_nodes_recursive(parent_elem, current_lifeline_id=None):
-                    # --- 修复：将 ElementTree.findall 调用的 namespaces 参数传递过去 ---
-                    for node in parent_elem.findall(
-                        "./nodes", namespaces=self.namespaces
+            # 用显式栈遍历序列图中嵌套的节点，代替逐层递归，从主交互节点开始
+            # 栈中每项为 (父元素, 继承的生命线ID)；映射按 ID 存取，遍历顺序不影响结果
+            # 主交互节点最先出栈，其直接子节点（按文档顺序）顺带留给 Pass 2 的日志使用
+            top_level_nodes = []
+            stack = [(interaction_node, None)]
+            while stack:
+                parent_elem, current_lifeline_id = stack.pop()
+                child_nodes = parent_elem.findall("nodes")
+                if parent_elem is interaction_node:
+                    top_level_nodes = child_nodes
+                for node in child_nodes:
+                    node_xmi_type = node.get(xmi_type_key)
+                    node_id = node.get(xmi_id_key)
+                    if (
+                        endpoint_ids is not None
+                        and node_id
+                        and node_xmi_type != "trufun:TLifelineNode_SD"
                     ):
-                        node_xmi_type = node.get(
-                            f"{{{self.namespaces.get('xmi', '')}}}type"
+                        if node_xmi_type == "trufun:TEventOccurrenceNode":
+                            if current_lifeline_id and node_id in endpoint_ids:
+                                event_occurrence_to_lifeline_id_map[node_id] = (
+                                    current_lifeline_id
+                                )
+                        elif node_xmi_type in SEQUENCE_CONTAINER_NODE_TYPES:
+                            stack.append((node, current_lifeline_id))
+                        continue
+                    node_name = names_get(node_id, "")
+
+                    if node_id:
+                        display_name = node_name  # Default
+                        effective_lifeline_id = (
+                            current_lifeline_id  # Inherit context
                         )
-                        node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                        node_name = node.get("name", "").strip()
 
-                        if node_id:
-                            display_name = node_name  # Default
+                        if node_xmi_type == "trufun:TLifelineNode_SD":
                             effective_lifeline_id = (
-                                current_lifeline_id  # Inherit context
+                                node_id  # This node *is* a lifeline
                             )
-
-                            if node_xmi_type == "trufun:TLifelineNode_SD":
-                                effective_lifeline_id = (
-                                    node_id  # This node *is* a lifeline
-                                )
-                                if not node_name and node.get("owner"):
-                                    owner_name = self._model_elements_by_id.get(
-                                        node.get("owner")
+                            if not node_name and node.get("owner"):
+                                owner_name = model_names_get(node.get("owner"))
+                                if (
+                                    owner_name and "类型" not in owner_name
+                                ):  # Avoid using generic type names as actual names
+                                    display_name = f":{owner_name}"
+                                else:
+                                    display_name = (
+                                        f"未命名生命线 ({node.get('owner')})"
                                     )
-                                    if (
-                                        owner_name and "类型" not in owner_name
-                                    ):  # Avoid using generic type names as actual names
-                                        display_name = f":{owner_name}"
-                                    else:
-                                        display_name = (
-                                            f"未命名生命线 ({node.get('owner')})"
-                                        )
-                                elif not node_name:
-                                    display_name = f"未命名生命线 ({node_id})"
-
-                                diagram_node_map[node_id] = display_name
-                                # Recurse into children of lifeline (activations, etc.)
-                                collect_seq_nodes_recursive(node, effective_lifeline_id)
-
-                            elif node_xmi_type in [
-                                "trufun:TInvocationSpecificationNode",
-                                "trufun:TExecutionSpecificationNode",
-                            ]:
-                                display_name = (
-                                    f"激活 ({node_id})" if not node_name else node_name
-                                )  # Activations are usually unnamed
-                                diagram_node_map[node_id] = display_name
-                                # Recurse into activations (for event occurrences)
-                                collect_seq_nodes_recursive(node, effective_lifeline_id)
-
-                            elif node_xmi_type == "trufun:TEventOccurrenceNode":
+                            elif not node_name:
+                                display_name = f"未命名生命线 ({node_id})"
+
+                            diagram_node_map[node_id] = display_name
+                            # Descend into children of lifeline (activations, etc.)
+                            stack.append((node, effective_lifeline_id))
+
+                        elif node_xmi_type in SEQUENCE_SKIPPED_NODE_TYPES:
+                            # 装配连线、分隔线等可视元素和显示标签不是逻辑元素，不加入映射
+                            continue
+
+                        elif node_xmi_type == "trufun:TCombinedFragmentNode":
+                            # Combined Fragments can have a 'kind' attribute (e.g., 'opt', 'alt')
+                            kind = (
+                                node.get("kind", "未知类型").upper()
+                            )  # "kind" is not in this XML, but common in UML
+                            display_name = f"组合片段 ({kind}): {node_name if node_name else ''}".strip(
+                                ": "
+                            )
+                            diagram_node_map[node_id] = display_name
+                            # Descend into operands
+                            stack.append((node, effective_lifeline_id))
+
+                        elif make_label := SEQUENCE_NODE_LABELS.get(node_xmi_type):
+                            diagram_node_map[node_id] = make_label(node_id, node_name)
+                            if node_xmi_type == "trufun:TEventOccurrenceNode":
                                 # Event occurrences are message endpoints, link them to their lifeline
-                                display_name = f"事件 ({node_id})"  # Usually unnamed
-                                diagram_node_map[node_id] = display_name
                                 if effective_lifeline_id:
                                     event_occurrence_to_lifeline_id_map[node_id] = (
                                         effective_lifeline_id
                                     )
+                            elif node_xmi_type in SEQUENCE_CONTAINER_NODE_TYPES:
+                                # Activations and operands contain event occurrences, descend
+                                stack.append((node, effective_lifeline_id))
 
-                            elif node_xmi_type == "trufun:TStateInvariantNode":
-                                display_name = f"状态不变量 ({node_name if node_name else node_id})"
-                                diagram_node_map[node_id] = display_name
-
-                            elif (
-                                node_xmi_type == "trufun:TInteractionOccurrenceNode"
-                            ):  # Interaction Use (ref)
-                                display_name = (
-                                    f"交互使用 ({node_name if node_name else node_id})"
-                                )
-                                diagram_node_map[node_id] = display_name
-
-                            elif node_xmi_type == "trufun:TCombinedFragmentNode":
-                                # Combined Fragments can have a 'kind' attribute (e.g., 'opt', 'alt')
-                                kind = (
-                                    node.get("kind", "未知类型").upper()
-                                )  # "kind" is not in this XML, but common in UML
-                                display_name = f"组合片段 ({kind}): {node_name if node_name else ''}".strip(
-                                    ": "
-                                )
-                                diagram_node_map[node_id] = display_name
-                                collect_seq_nodes_recursive(
-                                    node, effective_lifeline_id
-                                )  # Recurse into operands
-
-                            elif node_xmi_type == "trufun:TInteractionOperandNode":
-                                display_name = (
-                                    f"操作数 ({node_name if node_name else node_id})"
-                                )
-                                diagram_node_map[node_id] = display_name
-                                # Operands can contain messages or other elements, recurse
-                                collect_seq_nodes_recursive(node, effective_lifeline_id)
-
-                            elif node_xmi_type == "trufun:TMountingLinkNode":
-                                # These are visual links, not logical elements to map for names
-                                continue
-                            elif node_xmi_type == "trufun:TSplitterNode":
-                                # These are visual dividers, not logical elements
-                                continue
-                            elif node_xmi_type == "trufun:SubLabel":
-                                # These are display labels, handled separately for connections/elements
-                                continue
-                            else:
-                                # Fallback for any other unhandled node types, ensuring they are mapped
-                                display_name = f"其他节点 ({self._strip_ns(node_xmi_type)}): {node_name if node_name else 'ID ' + node_id}"
-                                diagram_node_map[node_id] = display_name
-
-                # Start collection from the main interaction node
-                collect_seq_nodes_recursive(
-                    interaction_node
-                )  # 现在这个调用被保护在 if interaction_node is not None 之后
+                        else:
+                            # Fallback for any other unhandled node types, ensuring they are mapped
+                            display_name = f"其他节点 ({node_xmi_type}): {node_name if node_name else 'ID ' + node_id}"
+                            diagram_node_map[node_id] = display_name
 
-                # --- Pass 2: Log nodes and messages in structured order ---
+            # --- Pass 2: Log nodes and messages in structured order ---
 
-                # Log lifelines first
+            # Log lifelines first
+            if log_info:
                 logger.info("  --- 生命线 ---")
-                # --- 修复：将 ElementTree.findall 调用的 namespaces 参数传递过去 ---
                 lifeline_nodes_sorted = sorted(
-                    interaction_node.findall(
-                        f"./nodes[@{{{self.namespaces.get('xmi', '')}}}type='trufun:TLifelineNode_SD']",
-                        namespaces=self.namespaces,
+                    (
+                        node
+                        for node in top_level_nodes
+                        if node.get(xmi_type_key) == "trufun:TLifelineNode_SD"
                     ),
-                    key=lambda x: int(x.get("location", "0,0").split(",")[0]),
+                    key=lambda x: int(x.get("location", "0,0").split(",", 1)[0]),
                     # Sort by X coordinate for consistent output
                 )
                 for lifeline_node in lifeline_nodes_sorted:
-                    lifeline_id = lifeline_node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}id"
-                    )
+                    lifeline_id = lifeline_node.get(xmi_id_key)
                     logger.info(
                         f"    --| [green]{diagram_node_map.get(lifeline_id, '未知生命线')}[/green]"
                     )
                     # Optionally, log sub-elements of lifeline here if desired for full detail
                     # For example, activations, state invariants could be logged here
-                    # --- 修复：将 ElementTree.findall 调用的 namespaces 参数传递过去 ---
-                    for sub_node in lifeline_node.findall(
-                        "./nodes", namespaces=self.namespaces
-                    ):
-                        sub_node_xmi_type = sub_node.get(
-                            f"{{{self.namespaces.get('xmi', '')}}}type"
-                        )
-                        sub_node_id = sub_node.get(
-                            f"{{{self.namespaces.get('xmi', '')}}}id"
-                        )
-                        if sub_node_xmi_type in [
-                            "trufun:TInvocationSpecificationNode",
-                            "trufun:TExecutionSpecificationNode",
-                        ]:
+                    for sub_node in lifeline_node.findall("nodes"):
+                        sub_node_xmi_type = sub_node.get(xmi_type_key)
+                        sub_node_id = sub_node.get(xmi_id_key)
+                        if sub_node_xmi_type in SEQUENCE_ACTIVATION_NODE_TYPES:
                             logger.info(
                                 f"      ▪️ {diagram_node_map.get(sub_node_id, '未知激活')}"
                             )
@@ -1306,16 +1344,9 @@ class SysMLParser:
 
                 # Log top-level Interaction uses and Combined Fragments
                 logger.info("  --- 交互使用/组合片段 ---")
-                # --- 修复：将 ElementTree.findall 调用的 namespaces 参数传递过去 ---
-                for top_level_node in interaction_node.findall(
-                    "./nodes", namespaces=self.namespaces
-                ):
-                    node_xmi_type = top_level_node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
-                    )
-                    node_id = top_level_node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}id"
-                    )
+                for top_level_node in top_level_nodes:
+                    node_xmi_type = top_level_node.get(xmi_type_key)
+                    node_id = top_level_node.get(xmi_id_key)
                     if node_xmi_type == "trufun:TInteractionOccurrenceNode":
                         logger.info(
                             f"    ▶️ {diagram_node_map.get(node_id, '未知交互使用')}"
@@ -1324,90 +1355,82 @@ class SysMLParser:
                         logger.info(
                             f"    🔀 {diagram_node_map.get(node_id, '未知组合片段')}"
                         )
-                        # --- 修复：将 ElementTree.findall 调用的 namespaces 参数传递过去 ---
-                        for operand_node in top_level_node.findall(
-                            f"./nodes[@{{{self.namespaces.get('xmi', '')}}}type='trufun:TInteractionOperandNode']",
-                            namespaces=self.namespaces,
-                        ):
-                            operand_id = operand_node.get(
-                                f"{{{self.namespaces.get('xmi', '')}}}id"
-                            )
+                        for operand_node in top_level_node.findall("nodes"):
+                            if (
+                                operand_node.get(xmi_type_key)
+                                != "trufun:TInteractionOperandNode"
+                            ):
+                                continue
+                            operand_id = operand_node.get(xmi_id_key)
                             logger.info(
                                 f"      ▪️ 操作数: {diagram_node_map.get(operand_id, '未知操作数')}"
                             )
 
-                # 3. 提取消息 (Messages - Connections)
-                logger.info("  --- 消息 ---")
-                found_messages = False
-                # --- 修复：将 ElementTree.findall 调用的 namespaces 参数传递过去 ---
-                for msg_conn in seq_diagram_elem.findall(
-                    "./connections", namespaces=self.namespaces
-                ):
-                    conn_xmi_type = msg_conn.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
-                    )
-                    if conn_xmi_type == "trufun:TMessageConnection_SD":
-                        found_messages = True
-                        source_event_id = msg_conn.get("source")
-                        target_event_id = msg_conn.get("target")
-                        message_name = msg_conn.get("name", "Unnamed Message").strip()
-
-                        # Resolve lifeline IDs from event occurrences
-                        source_lifeline_id = event_occurrence_to_lifeline_id_map.get(
-                            source_event_id
-                        )
-                        target_lifeline_id = event_occurrence_to_lifeline_id_map.get(
-                            target_event_id
-                        )
+            # 3. 提取消息 (Messages - Connections)
+            logger.info("  --- 消息 ---")
+            get_name = diagram_node_map.get
+            for msg_conn in message_conns:
+                source_event_id = msg_conn.get("source")
+                target_event_id = msg_conn.get("target")
+                message_name = msg_conn.get("name", "Unnamed Message").strip()
+
+                # Resolve lifeline IDs from event occurrences
+                source_lifeline_id = event_occurrence_to_lifeline_id_map.get(
+                    source_event_id
+                )
+                target_lifeline_id = event_occurrence_to_lifeline_id_map.get(
+                    target_event_id
+                )
 
-                        source_name = diagram_node_map.get(
-                            source_lifeline_id, f"未知生命线 (事件: {source_event_id})"
-                        )
-                        target_name = diagram_node_map.get(
-                            target_lifeline_id, f"未知生命线 (事件: {target_event_id})"
-                        )
+                source_name = get_name(source_lifeline_id)
 
-                        # Collect additional details from subLabels if alias is "Name" and different, or other relevant aliases
-                        # --- 修复：将 ElementTree.findall 调用的 namespaces 参数传递过去 ---
-                        message_label_details = []
-                        for sublabel in msg_conn.findall(
-                            "./subLabels", namespaces=self.namespaces
-                        ):
-                            name_value = sublabel.get("name")
-                            if (
-                                sublabel.get("alias") == "Name"
-                                and name_value is not None
-                                and name_value.strip() != message_name
-                            ):
-                                message_label_details.append(name_value.strip())
-                            # You can add more specific aliases here if they appear in your XML
-                            # e.g., if you have sublabels for arguments, stereotypes, etc.
-                            # elif sublabel.get("alias') == "Arguments":
-                            #     message_label_details.append(f"Args: {sublabel.get('name').strip()}")
-                            # elif sublabel.get("alias') == "Stereotype":
-                            #     message_label_details.append(f"Stereo: {sublabel.get('name').strip()}")
-
-                        full_message_label = message_name
-                        if message_label_details:
-                            full_message_label += (
-                                f" ({', '.join(message_label_details)})"
-                            )
+                if source_name is None:
+                    source_name = f"未知生命线 (事件: {source_event_id})"
+                target_name = get_name(target_lifeline_id)
+                if target_name is None:
+                    target_name = f"未知生命线 (事件: {target_event_id})"
 
-                        logger.info(
-                            f"    -> 消息: [bold green]{source_name}[/bold green] --[blue]{full_message_label}[/blue]--> [bold blue]{target_name}[/bold blue]"
-                        )
-                        # Store the triple for later use
-                        self.triples.append(
-                            (source_name, full_message_label, target_name)
-                        )
+                # Collect additional details from subLabels if alias is "Name" and different, or other relevant aliases
+                message_label_details = []
+                for sublabel in msg_conn.findall("subLabels"):
+                    if (
+                        sublabel.get("alias") == "Name"
+                        and (name_value := sublabel.get("name")) is not None
+                    ):
+                        name_value = name_value.strip()  # 每个名称只去除一次空白
+                        if name_value != message_name:
+                            message_label_details.append(name_value)
+                    # You can add more specific aliases here if they appear in your XML
+                    # e.g., if you have sublabels for arguments, stereotypes, etc.
+                    # elif sublabel.get("alias') == "Arguments":
+                    #     message_label_details.append(f"Args: {sublabel.get('name').strip()}")
+                    # elif sublabel.get("alias') == "Stereotype":
+                    #     message_label_details.append(f"Stereo: {sublabel.get('name').strip()}")
+
+                full_message_label = (
+                    f"{message_name} ({', '.join(message_label_details)})"
+                    if message_label_details
+                    else message_name
+                )
+
+                if log_info:
+                    logger.info(
+                        f"    -> 消息: [bold green]{source_name}[/bold green] --[blue]{full_message_label}[/blue]--> [bold blue]{target_name}[/bold blue]"
+                    )
+                # Store the triple for later use
+                yield (source_name, full_message_label, target_name)
 
-                if not found_messages:
-                    logger.info("    ⚠️  未发现任何消息。")
+            if not message_conns:
+                logger.info("    ⚠️  未发现任何消息。")
 
     # ----------------------------------------------------------------------
     # --- 新增的包图提取方法 ---
     # ----------------------------------------------------------------------
+
     def extract_package_diagrams(self):
+        self.triples.extend(self.iter_package_triples())
+
+    def iter_package_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取包图。[/bold yellow]"
@@ -1416,111 +1439,104 @@ class SysMLParser:
 
         logger.info("\n📦 [bold cyan]开始提取包图及其包和导入关系[/bold cyan]")
 
-        # 遍历所有元素以查找包图
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # 根据 stereotype 属性找到包图元素
-            # 注意：XML中xmi:type可能是TClassDiagram，但stereotype是SysMlPackageDiagram
-            if tag == "contents" and elem.get("stereotype") == "SysMlPackageDiagram":
-                package_diagram_elem = elem
-                diagram_name = package_diagram_elem.get("name", "未命名包图")
-                logger.info(f"\n📁 分析包图: [bold]{diagram_name}[/bold]")
-
-                node_id_to_name = {}
-
-                # 1. 提取所有包节点
-                # 包节点类型为 trufun:TPackageNode
-                for node in package_diagram_elem.findall(
-                    ".//nodes", namespaces=self.namespaces
-                ):
-                    node_xmi_type = node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
-                    )
-                    node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                    node_name = node.get("name", "").strip()
-
-                    if node_id and node_xmi_type == "trufun:TPackageNode":
-                        node_id_to_name[node_id] = node_name
-                        logger.info(f"  📂 包: [green]{node_name}[/green]")
-                    # 可以在这里添加对其他类型节点（如注释）的识别，如果它们是直接的图节点
-
-                # 2. 提取并解析连接关系 (导入关系)
-                found_connections = False
-                for conn in package_diagram_elem.findall(
-                    "./connections", namespaces=self.namespaces
-                ):
-                    source_id = conn.get("source")
-                    target_id = conn.get("target")
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        xmi_type_key = self._xmi_type_key
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        # 遍历加载时已归类的包图
+        for elem in self._diagrams["package"]:
+            package_diagram_elem = elem
+            diagram_name = package_diagram_elem.get("name", "未命名包图")
+            logger.info("\n📁 分析包图: [bold]%s[/bold]", diagram_name)
+
+            # 1. 提取所有包节点
+            # 包节点类型为 trufun:TPackageNode，连接只解析到本图中的包节点
+            # 可以在这里添加对其他类型节点（如注释）的识别，如果它们是直接的图节点
+            package_nodes = [
+                (node_id, names_get(node_id, ""))
+                for node in package_diagram_elem.iter("nodes")
+                if node.get(xmi_type_key) == "trufun:TPackageNode"
+                and (node_id := node.get(xmi_id_key))
+            ]
+            node_id_to_name = dict(package_nodes)
+            if log_info:
+                for _, node_name in package_nodes:
+                    logger.info(f"  📂 包: [green]{node_name}[/green]")
+
+            # 2. 提取并解析连接关系 (导入关系)
+            get_name = node_id_to_name.get
+            found_connections = False
+            for conn in package_diagram_elem.findall("connections"):
+                source_id = conn.get("source")
+                target_id = conn.get("target")
+
+                if source_id and target_id:
+                    found_connections = True
+                    source_name = get_name(source_id)
+                    if source_name is None:
+                        source_name = f"未知包 (ID: {source_id})"
+                    target_name = get_name(target_id)
+                    if target_name is None:
+                        target_name = f"未知包 (ID: {target_id})"
+
+                    conn_xmi_type = conn.get(xmi_type_key)
+                    conn_type_specific = conn.get(
+                        "type"
+                    )  # 例如 ElementImport, PackageImport
 
-                    if source_id and target_id:
-                        found_connections = True
-                        source_name = node_id_to_name.get(
-                            source_id, f"未知包 (ID: {source_id})"
-                        )
-                        target_name = node_id_to_name.get(
-                            target_id, f"未知包 (ID: {target_id})"
-                        )
+                    relationship_label = "Unknown Relationship"
 
-                        conn_xmi_type = conn.get(
-                            f"{{{self.namespaces.get('xmi', '')}}}type"
+                    if (
+                        conn_xmi_type == "trufun:TRealizationConnection"
+                        and conn_type_specific
+                    ):
+                        if conn_type_specific == "ElementImport":
+                            relationship_label = "元素导入"
+                        elif conn_type_specific == "PackageImport":
+                            relationship_label = "包导入"
+                        else:
+                            relationship_label = conn_type_specific  # Fallback for other realization types
+                    else:
+                        # Fallback if xmi:type is different or type attribute is missing
+                        relationship_label = (
+                            (conn_xmi_type or "")
+                            .replace("trufun:", "")
+                            .replace("Connection", "")
                         )
-                        conn_type_specific = conn.get(
-                            "type"
-                        )  # 例如 ElementImport, PackageImport
-
-                        relationship_label = "Unknown Relationship"
 
+                    # 检查 subLabels 中是否有构造型信息 (例如 <<import>>)
+                    stereotype_label = ""
+                    for sublabel in conn.findall("subLabels"):
                         if (
-                            conn_xmi_type == "trufun:TRealizationConnection"
-                            and conn_type_specific
-                        ):
-                            if conn_type_specific == "ElementImport":
-                                relationship_label = "元素导入"
-                            elif conn_type_specific == "PackageImport":
-                                relationship_label = "包导入"
-                            else:
-                                relationship_label = conn_type_specific  # Fallback for other realization types
-                        else:
-                            # Fallback if xmi:type is different or type attribute is missing
-                            relationship_label = (
-                                (self._strip_ns(conn_xmi_type) or "")
-                                .replace("trufun:", "")
-                                .replace("Connection", "")
-                            )
-
-                        # 检查 subLabels 中是否有构造型信息 (例如 <<import>>)
-                        stereotype_label = ""
-                        for sublabel in conn.findall(
-                            "./subLabels", namespaces=self.namespaces
-                        ):
-                            if (
-                                sublabel.get("alias") == "FixedName"
-                            ):  # The XML uses FixedName for <<import>>
-                                stereotype_text = sublabel.get("name", "").strip()
-                                if stereotype_text:
-                                    stereotype_label = f" ({stereotype_text})"
-                                break  # Assume one fixed name stereotype per connection
-
+                            sublabel.get("alias") == "FixedName"
+                        ):  # The XML uses FixedName for <<import>>
+                            stereotype_text = sublabel.get("name", "").strip()
+                            if stereotype_text:
+                                stereotype_label = f" ({stereotype_text})"
+                            break  # Assume one fixed name stereotype per connection
+
+                    if log_info:
                         logger.info(
                             f"  🔗 关系 ([blue]{relationship_label}{stereotype_label}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]"
                         )
-                        # Store the triple for later use
-                        self.triples.append(
-                            (
-                                source_name,
-                                f"{relationship_label}{stereotype_label}",
-                                target_name,
-                            )
-                        )
+                    # Store the triple for later use
+                    yield (
+                        source_name,
+                        f"{relationship_label}{stereotype_label}",
+                        target_name,
+                    )
 
-                if not found_connections:
-                    logger.info("  ⚠️  未发现任何连接关系。")
+            if not found_connections:
+                logger.info("  ⚠️  未发现任何连接关系。")
 
     # ----------------------------------------------------------------------
     # --- 修正后的参数图提取方法 ---
     # ----------------------------------------------------------------------
+
     def extract_parametric_diagrams(self):
+        self.triples.extend(self.iter_parametric_triples())
+
+    def iter_parametric_triples(self):
         if self.root is None:
             logger.warning(
                 "⚠️  [bold yellow]未加载 XML 根元素，无法提取参数图。[/bold yellow]"
@@ -1531,139 +1547,133 @@ class SysMLParser:
             "\n📐 [bold magenta]开始提取参数图及其约束和绑定关系[/bold magenta]"
         )
 
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # 查找参数图元素：根据提供的XML，stereotype是"SysmlParameterDiagram"
-            # 并且 xmi:type 是 "trufun:TCompositeStructureDiagram"
-            if (
-                tag == "contents"
-                and elem.get("stereotype")
-                == "SysmlParameterDiagram"  # 修正：单数 "Parameter"
-                and elem.get(f"{{{self.namespaces.get('xmi', '')}}}type")
-                == "trufun:TCompositeStructureDiagram"
-            ):  # 增加 xmi:type 确认
-                param_diagram_elem = elem
-                diagram_name = param_diagram_elem.get("name", "未命名参数图")
-                logger.info(f"\n📈 分析参数图: [bold]{diagram_name}[/bold]")
-
-                node_id_to_name = {}
-
-                # 1. 遍历图中的所有节点，构建ID到名称的映射
-                # 这次遍历的目的是先收集所有节点ID及其可显示名称，以便后续连接解析时查找
-                for node in param_diagram_elem.findall(
-                    ".//nodes", namespaces=self.namespaces
-                ):
-                    node_xmi_type = node.get(
-                        f"{{{self.namespaces.get('xmi', '')}}}type"
-                    )
-                    node_id = node.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-                    node_name = node.get("name", "").strip()
-                    node_type = node.get(
-                        "type"
-                    )  # SysML.IBD.ConstraintProperty, SysML.IBD.ValueProperty, SysML.IBD.PartProperty
-
-                    if node_id:
-                        display_name = node_name
-                        if (
-                            node_xmi_type == "trufun:TStructureClassNode"
-                            and node.get("stereotype") == "<<block>>"
-                        ):
-                            display_name = f"上下文块: {node_name}"
-                            node_id_to_name[node_id] = display_name
+        xmi_id_key = self._xmi_id_key
+        names_get = self._names_by_id.get  # 加载时已去除首尾空白的名称
+        model_names_get = self._model_elements_by_id.get  # 全局模型元素名称
+        xmi_type_key = self._xmi_type_key
+        log_info = logger.isEnabledFor(logging.INFO)  # 逐节点日志仅在需要输出时才构造
+        for elem in self._diagrams["parametric"]:
+            param_diagram_elem = elem
+            diagram_name = param_diagram_elem.get("name", "未命名参数图")
+            logger.info("\n📈 分析参数图: [bold]%s[/bold]", diagram_name)
+
+            node_id_to_name = {}
+
+            # 1. 遍历图中的所有节点，构建ID到名称的映射
+            # 这次遍历的目的是先收集所有节点ID及其可显示名称，以便后续连接解析时查找
+            # 不输出日志时只有连接端点会被查找，其余节点跳过
+            endpoint_ids = (
+                None if log_info else self._connection_endpoint_ids(param_diagram_elem)
+            )
+            for node in param_diagram_elem.iter("nodes"):
+                node_id = node.get(xmi_id_key)
+                if endpoint_ids is not None and node_id not in endpoint_ids:
+                    continue
+                node_xmi_type = node.get(xmi_type_key)
+                node_name = names_get(node_id, "")
+                node_type = node.get(
+                    "type"
+                )  # SysML.IBD.ConstraintProperty, SysML.IBD.ValueProperty, SysML.IBD.PartProperty
+
+                if node_id:
+                    display_name = node_name
+                    if (
+                        node_xmi_type == "trufun:TStructureClassNode"
+                        and node.get("stereotype") == "<<block>>"
+                    ):
+                        display_name = f"上下文块: {node_name}"
+                        node_id_to_name[node_id] = display_name
+                        if log_info:
                             logger.info(f"  📦 {display_name}")  # 打印主约束块
 
-                        elif node_type == "SysML.IBD.ConstraintProperty":
-                            # 约束属性的图节点，其name属性通常包含有用的信息，例如 "约束 : 总重量约束"
-                            # 如果name为空，可以尝试通过modelElement引用
-                            referenced_name = None
-                            if node.get("modelElement"):
-                                referenced_name = self._model_elements_by_id.get(
-                                    node.get("modelElement")
-                                )
+                    elif node_type == "SysML.IBD.ConstraintProperty":
+                        # 约束属性的图节点，其name属性通常包含有用的信息，例如 "约束 : 总重量约束"
+                        # 如果name为空，可以尝试通过modelElement引用
+                        referenced_name = None
+                        if node.get("modelElement"):
+                            referenced_name = model_names_get(node.get("modelElement"))
 
-                            if node_name:
-                                display_name = f"约束属性实例: {node_name}"
-                            elif (
-                                referenced_name and "类型" not in referenced_name
-                            ):  # 避免使用泛型类型作为名称
-                                display_name = f"约束属性实例: {referenced_name}"
-                            else:
-                                display_name = f"约束属性实例 (ID: {node_id})"
+                        if node_name:
+                            display_name = f"约束属性实例: {node_name}"
+                        elif (
+                            referenced_name and "类型" not in referenced_name
+                        ):  # 避免使用泛型类型作为名称
+                            display_name = f"约束属性实例: {referenced_name}"
+                        else:
+                            display_name = f"约束属性实例 (ID: {node_id})"
 
-                            node_id_to_name[node_id] = display_name
+                        node_id_to_name[node_id] = display_name
+                        if log_info:
                             logger.info(f"  ➡️ {display_name}")  # 打印约束属性实例
 
-                        elif node_type == "SysML.IBD.ValueProperty":
-                            # 值属性的图节点
-                            display_name = f"值属性: {node_name}"
-                            node_id_to_name[node_id] = display_name
+                    elif node_type == "SysML.IBD.ValueProperty":
+                        # 值属性的图节点
+                        display_name = f"值属性: {node_name}"
+                        node_id_to_name[node_id] = display_name
+                        if log_info:
                             logger.info(f"  📊 {display_name}")  # 打印值属性
 
-                        elif (
-                            node_type == "SysML.IBD.PartProperty"
-                        ):  # 新增：识别部件属性
-                            display_name = f"部件属性: {node_name.lstrip(': ').strip()}"
-                            node_id_to_name[node_id] = display_name
+                    elif (
+                        node_type == "SysML.IBD.PartProperty"
+                    ):  # 新增：识别部件属性
+                        display_name = f"部件属性: {node_name.lstrip(': ').strip()}"
+                        node_id_to_name[node_id] = display_name
+                        if log_info:
                             logger.info(f"  🧩 {display_name}")  # 打印部件属性
 
-                            # 遍历部件属性内部的节点，特别是值属性
-                            for inner_node in node.findall(
-                                "./nodes", namespaces=self.namespaces
+                        # 遍历部件属性内部的节点，特别是值属性
+                        for inner_node in node.findall("nodes"):
+                            inner_node_type = inner_node.get("type")
+                            _ = inner_node.get(xmi_type_key)
+                            inner_node_id = inner_node.get(xmi_id_key)
+                            inner_node_name = names_get(inner_node_id, "")
+
+                            if (
+                                inner_node_id
+                                and inner_node_type == "SysML.IBD.ValueProperty"
                             ):
-                                inner_node_type = inner_node.get("type")
-                                _ = inner_node.get(
-                                    f"{{{self.namespaces.get('xmi', '')}}}type"
+                                inner_display_name = (
+                                    f"内部值属性: {inner_node_name}"
                                 )
-                                inner_node_id = inner_node.get(
-                                    f"{{{self.namespaces.get('xmi', '')}}}id"
+                                node_id_to_name[inner_node_id] = (
+                                    inner_display_name  # 确保内部节点也被映射
                                 )
-                                inner_node_name = inner_node.get("name", "").strip()
-
-                                if (
-                                    inner_node_id
-                                    and inner_node_type == "SysML.IBD.ValueProperty"
-                                ):
-                                    inner_display_name = (
-                                        f"内部值属性: {inner_node_name}"
-                                    )
-                                    node_id_to_name[inner_node_id] = (
-                                        inner_display_name  # 确保内部节点也被映射
-                                    )
+                                if log_info:
                                     logger.info(
                                         f"    - {inner_display_name}"
                                     )  # 打印内部值属性
 
-                        elif (
-                            node_xmi_type == "trufun:TPortNode"
-                            and node.get("stereotype") == "<<constraintParameter>>"
-                        ):  # 参数通常表现为端口
-                            # 参数的名称通常在 name 属性中，例如 "p1 : Real"
-                            # 或者在 SubLabel 中有更规范的名称
-                            parameter_name_from_sublabel = None
-                            for sublabel in node.findall(
-                                "./subLabels", namespaces=self.namespaces
-                            ):
-                                if (
-                                    sublabel.get("alias") == "Name"
-                                ):  # Trufun有时会将完整参数名放在这里
-                                    parameter_name_from_sublabel = sublabel.get("name")
-                                    if parameter_name_from_sublabel is not None:
-                                        parameter_name_from_sublabel = (
-                                            parameter_name_from_sublabel.strip()
-                                        )
-                                    break
-
-                            if parameter_name_from_sublabel:
-                                display_name = f"参数: {parameter_name_from_sublabel}"
-                            elif node_name:
-                                # 清理掉可能的类型信息，例如 "p1 : Real" 变成 "p1"
-                                display_name = (
-                                    f"参数: {node_name.split(':')[0].strip()}"
-                                )
-                            else:
-                                display_name = f"参数 (ID: {node_id})"
+                    elif (
+                        node_xmi_type == "trufun:TPortNode"
+                        and node.get("stereotype") == "<<constraintParameter>>"
+                    ):  # 参数通常表现为端口
+                        # 参数的名称通常在 name 属性中，例如 "p1 : Real"
+                        # 或者在 SubLabel 中有更规范的名称
+                        parameter_name_from_sublabel = None
+                        for sublabel in node.findall("subLabels"):
+                            if (
+                                sublabel.get("alias") == "Name"
+                            ):  # Trufun有时会将完整参数名放在这里
+                                parameter_name_from_sublabel = sublabel.get("name")
+                                if parameter_name_from_sublabel is not None:
+                                    parameter_name_from_sublabel = (
+                                        parameter_name_from_sublabel.strip()
+                                    )
+                                break
 
+                        if parameter_name_from_sublabel:
+                            display_name = f"参数: {parameter_name_from_sublabel}"
+                        elif node_name:
+                            # 清理掉可能的类型信息，例如 "p1 : Real" 变成 "p1"
+                            display_name = (
+                                f"参数: {node_name.split(':')[0].strip()}"
+                            )
+                        else:
+                            display_name = f"参数 (ID: {node_id})"
+
+                        node_id_to_name[node_id] = display_name
+                        # 打印参数，并指出其所属；所属节点名称只用于日志，不输出时不再查找
+                        if log_info:
                             # 尝试获取其所属的图上父节点（Constraint Property或Value Property）的名称
                             parent_node_id = node.get(
                                 "parentNode"
@@ -1676,83 +1686,86 @@ class SysMLParser:
                             ):  # 如果图节点映射中没有，尝试从全局模型元素映射中获取
                                 # 这里的owner通常是模型元素而非图元素，用于更通用的查找
                                 owner_id_in_model = node.get("owner")
-                                parent_name = self._model_elements_by_id.get(
+                                parent_name = model_names_get(
                                     owner_id_in_model, "未知所有者"
                                 )
-
-                            node_id_to_name[node_id] = display_name
-                            # 打印参数，并指出其所属
                             logger.info(
                                 f"    🔸 {display_name} (所属图节点: {parent_name})"
                             )
 
-                        elif node_xmi_type == "trufun:SubLabel":
-                            continue  # SubLabels are just for display, not primary nodes we map here
+                    elif node_xmi_type == "trufun:SubLabel":
+                        continue  # SubLabels are just for display, not primary nodes we map here
+                    else:
+                        # 捕获其他未处理的节点类型，以防遗漏
+                        if node_name:
+                            display_name = f"其他节点 ({node_xmi_type}): {node_name}"
                         else:
-                            # 捕获其他未处理的节点类型，以防遗漏
-                            if node_name:
-                                display_name = f"其他节点 ({self._strip_ns(node_xmi_type)}): {node_name}"
-                            else:
-                                display_name = f"其他节点 ({self._strip_ns(node_xmi_type)}): ID {node_id}"
-                            node_id_to_name[node_id] = (
-                                display_name  # 仍然加入map，以防被连接引用
-                            )
-
-                # 2. 提取并解析连接关系 (Binding Connectors)
-                found_connections = False
-                for conn in param_diagram_elem.findall(
-                    "./connections", namespaces=self.namespaces
-                ):
-                    source_id = conn.get("source")
-                    target_id = conn.get("target")
-
-                    # 检查连接是否是绑定连接器：通过 palette_entry_id 属性精确识别
-                    binding_connector_detail = conn.find(
-                        "./eAnnotations/details[@key='palette_entry_id']",
-                        namespaces=self.namespaces,
-                    )
-
-                    if (
-                        source_id
-                        and target_id
-                        and binding_connector_detail is not None
-                        and binding_connector_detail.get("value")
-                        == "SysML.IBD.BindingConnector"
-                    ):
-                        found_connections = True
-                        source_name = node_id_to_name.get(
-                            source_id, f"未知节点 (ID: {source_id})"
-                        )
-                        target_name = node_id_to_name.get(
-                            target_id, f"未知节点 (ID: {target_id})"
+                            display_name = f"其他节点 ({node_xmi_type}): ID {node_id}"
+                        node_id_to_name[node_id] = (
+                            display_name  # 仍然加入map，以防被连接引用
                         )
 
-                        # 绑定连接器通常会有 <<equal>> 构造型，可以从 stereotype 属性中获取
-                        conn_stereotype = conn.get("stereotype", "").strip("<>")
-                        if conn_stereotype:
-                            conn_type_label = f"Binding ({conn_stereotype})"
-                        else:
-                            conn_type_label = "Binding"
+            # 2. 提取并解析连接关系 (Binding Connectors)
+            get_name = node_id_to_name.get
+            found_connections = False
+            for conn in param_diagram_elem.findall("connections"):
+                source_id = conn.get("source")
+                target_id = conn.get("target")
+
+                # 检查连接是否是绑定连接器：通过 palette_entry_id 属性精确识别
+                binding_connector_detail = next(
+                    (
+                        detail
+                        for annotation in conn.iterfind("eAnnotations")
+                        for detail in annotation.iterfind("details")
+                        if detail.get("key") == "palette_entry_id"
+                    ),
+                    None,
+                )
+
+                if (
+                    source_id
+                    and target_id
+                    and binding_connector_detail is not None
+                    and binding_connector_detail.get("value")
+                    == "SysML.IBD.BindingConnector"
+                ):
+                    found_connections = True
+                    source_name = get_name(source_id)
+                    if source_name is None:
+                        source_name = f"未知节点 (ID: {source_id})"
+                    target_name = get_name(target_id)
+                    if target_name is None:
+                        target_name = f"未知节点 (ID: {target_id})"
+
+                    # 绑定连接器通常会有 <<equal>> 构造型，可以从 stereotype 属性中获取
+                    conn_stereotype = conn.get("stereotype", "").strip("<>")
+                    if conn_stereotype:
+                        conn_type_label = f"Binding ({conn_stereotype})"
+                    else:
+                        conn_type_label = "Binding"
 
+                    if log_info:
                         logger.info(
                             f"  🔗 绑定连接器 ([blue]{conn_type_label}[/blue]): [bold green]{source_name}[/bold green] ↔️ [bold blue]{target_name}[/bold blue]"
                         )
-                        # Store the triple for later use
-                        self.triples.append((source_name, conn_type_label, target_name))
-                    # 你可能也想捕获其他类型的连接，如果它们出现在参数图中
-                    # else:
-                    #     conn_xmi_type = conn.get(f"{{{self.namespaces.get('xmi', '')}}}type")
-                    #     conn_type = self._strip_ns(conn_xmi_type).replace("trufun:", "").replace("Connection", "")
-                    #     source_name = node_id_to_name.get(source_id, f"未知({source_id})")
-                    #     target_name = node_id_to_name.get(target_id, f"未知({target_id})")
-                    #     logger.info(f"  🔗 其他连接 ([blue]{conn_type}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]")
-
-                if not found_connections:
-                    logger.info("  ⚠️  未发现任何绑定连接关系。")
+                    # Store the triple for later use
+                    yield (source_name, conn_type_label, target_name)
+                # 你可能也想捕获其他类型的连接，如果它们出现在参数图中
+                # else:
+                #     conn_xmi_type = conn.get(xmi_type_key)
+                #     conn_type = conn_xmi_type.replace("trufun:", "").replace("Connection", "")
+                #     source_name = node_id_to_name.get(source_id, f"未知({source_id})")
+                #     target_name = node_id_to_name.get(target_id, f"未知({target_id})")
+                #     logger.info(f"  🔗 其他连接 ([blue]{conn_type}[/blue]): [bold green]{source_name}[/bold green] → [bold blue]{target_name}[/bold blue]")
+
+            if not found_connections:
+                logger.info("  ⚠️  未发现任何绑定连接关系。")
 
     # ----------------------------------------------------------------------
     # --- 新增的表格视图提取方法 ---
     # ----------------------------------------------------------------------
+
     def extract_tables(self):
         if self.root is None:
             logger.warning(
@@ -1763,74 +1776,67 @@ class SysMLParser:
         logger.info("\n📊 [bold purple]开始提取模型中的表格视图[/bold purple]")
 
         found_tables = False
-        # 遍历所有元素以查找表格视图
-        for elem in self.root.iter():
-            tag = self._strip_ns(elem.tag)
-
-            # 查找 xmi:type 为 "trufun:TTable" 的 "contents" 元素
-            if (
-                tag == "contents"
-                and elem.get(f"{{{self.namespaces.get('xmi', '')}}}type")
-                == "trufun:TTable"
-            ):
-                found_tables = True
-                table_elem = elem
-                table_name = table_elem.get("name", "未命名表格")
-                table_xmi_id = table_elem.get(f"{{{self.namespaces.get('xmi', '')}}}id")
-
-                logger.info(
-                    f"\n📑 发现表格: [bold]{table_name}[/bold] (ID: {table_xmi_id})"
-                )
-
-                # 提取并解析表格的元数据属性
-                owner_id = table_elem.get("owner")
-                row_scopes_id = table_elem.get("rowScopes")
-                table_define_id = table_elem.get("tableDefineID")
-                editor_id = table_elem.get("editorID")
-                image_path = table_elem.get("image")
-
-                # 解析所有者和行范围的名称
-                owner_name = (
-                    self._model_elements_by_id.get(
-                        owner_id, f"未知所有者 (ID: {owner_id})"
-                    )
-                    if owner_id
-                    else "N/A"
+        # 遍历加载时已归类的表格视图
+        xmi_id_key = self._xmi_id_key
+        for elem in self._diagrams["table"]:
+            found_tables = True
+            table_elem = elem
+            table_name = table_elem.get("name", "未命名表格")
+            table_xmi_id = table_elem.get(xmi_id_key)
+
+            logger.info("\n📑 发现表格: [bold]%s[/bold] (ID: %s)", table_name, table_xmi_id)
+
+            # 提取并解析表格的元数据属性
+            owner_id = table_elem.get("owner")
+            row_scopes_id = table_elem.get("rowScopes")
+            table_define_id = table_elem.get("tableDefineID")
+            editor_id = table_elem.get("editorID")
+            image_path = table_elem.get("image")
+
+            # 解析所有者和行范围的名称
+            owner_name = (
+                self._model_elements_by_id.get(
+                    owner_id, f"未知所有者 (ID: {owner_id})"
                 )
-                row_scopes_name = (
-                    self._model_elements_by_id.get(
-                        row_scopes_id, f"未知范围 (ID: {row_scopes_id})"
-                    )
-                    if row_scopes_id
-                    else "N/A"
+                if owner_id
+                else "N/A"
+            )
+            row_scopes_name = (
+                self._model_elements_by_id.get(
+                    row_scopes_id, f"未知范围 (ID: {row_scopes_id})"
                 )
+                if row_scopes_id
+                else "N/A"
+            )
 
-                logger.info("  🔸 类型: [cyan]trufun:TTable[/cyan]")
-                logger.info(f"  🔸 所属: [cyan]{owner_name}[/cyan]")
-                logger.info(f"  🔸 行范围: [cyan]{row_scopes_name}[/cyan]")
-                logger.info(
-                    f"  🔸 表格定义ID: [cyan]{table_define_id if table_define_id else 'N/A'}[/cyan]"
-                )
-                logger.info(
-                    f"  🔸 编辑器ID: [cyan]{editor_id if editor_id else 'N/A'}[/cyan]"
-                )
-                logger.info(
-                    f"  🔸 图标路径: [cyan]{image_path if image_path else 'N/A'}[/cyan]"
-                )
-                logger.info(
-                    f"  🔸 显示为框架: [cyan]{table_elem.get('showAsFrame', 'N/A')}[/cyan]"
-                )
-                logger.info(f"  🔸 缩放: [cyan]{table_elem.get('zoom', 'N/A')}[/cyan]")
-                logger.info(
-                    f"  🔸 网格间距: [cyan]{table_elem.get('gridSpacing', 'N/A')}[/cyan]"
-                )
+            logger.info("  🔸 类型: [cyan]trufun:TTable[/cyan]")
+            logger.info("  🔸 所属: [cyan]%s[/cyan]", owner_name)
+            logger.info("  🔸 行范围: [cyan]%s[/cyan]", row_scopes_name)
+            logger.info(
+                "  🔸 表格定义ID: [cyan]%s[/cyan]",
+                table_define_id if table_define_id else "N/A",
+            )
+            logger.info("  🔸 编辑器ID: [cyan]%s[/cyan]", editor_id if editor_id else "N/A")
+            logger.info(
+                "  🔸 图标路径: [cyan]%s[/cyan]",
+                image_path if image_path else "N/A",
+            )
+            logger.info(
+                "  🔸 显示为框架: [cyan]%s[/cyan]",
+                table_elem.get("showAsFrame", "N/A"),
+            )
+            logger.info("  🔸 缩放: [cyan]%s[/cyan]", table_elem.get("zoom", "N/A"))
+            logger.info(
+                "  🔸 网格间距: [cyan]%s[/cyan]",
+                table_elem.get("gridSpacing", "N/A"),
+            )
 
-                # 注意: 此处未解析表格的具体内容（行、列、单元格数据），
-                # 因为给定的XML片段中不包含这些结构。通常，表格的实际数据
-                # 会在XML中有更复杂的嵌套结构，例如 <columns> 和 <rows> 元素。
-                logger.info(
-                    "  ℹ️  [yellow]当前解析仅包含表格元数据，不包含具体行/列数据。[/yellow]"
-                )
+            # 注意: 此处未解析表格的具体内容（行、列、单元格数据），
+            # 因为给定的XML片段中不包含这些结构。通常，表格的实际数据
+            # 会在XML中有更复杂的嵌套结构，例如 <columns> 和 <rows> 元素。
+            logger.info(
+                "  ℹ️  [yellow]当前解析仅包含表格元数据，不包含具体行/列数据。[/yellow]"
+            )
 
         if not found_tables:
             logger.info("  ⚠️  未发现任何表格视图。")
@@ -1854,51 +1860,81 @@ class SysMLParser:
     #     },
     # 参考上面的导入格式，保存到json
     # name字段才是名字
-    def triples_to_graph_json(self, label: str = "tmx"):
-        graph = {"triples": []}
-        for triple in self.triples:
-            head, relation, tail = triple
-            # id 使用name的hash,这样可以统一相同名称的节点
-            graph["triples"].append(
+    def triples_to_graph_json(
+        self,
+        label: str = "tmx",
+        triples: Iterable[tuple[str, str, str]] | None = None,
+    ):
+        """
+        Args:
+            label (str): 节点标签
+            triples (Iterable[tuple[str, str, str]]): 要转换的三元组，默认使用 self.triples；
+                可直接传入 iter_triples() 边提取边转换，不必先把所有三元组存进列表
+        """
+        # 同一名称的节点字典只构造一次，重复出现的头/尾节点共享同一个对象（结果只用于序列化）
+        nodes = {}
+
+        def node_for(name):
+            node = nodes.get(name)
+            if node is None:
+                # id 使用name的摘要,这样可以统一相同名称的节点，且多次导出结果一致
+                node = nodes[name] = {
+                    "label": label,
+                    "id": node_id_for_name(name),
+                    "properties": {"name": name},
+                }
+            return node
+
+        graph = {
+            "triples": [
                 {
-                    "head": {
-                        "label": label,
-                        "id": str(hash(head)),
-                        "properties": {"name": head},
-                    },
+                    "head": node_for(head),
                     "relation": {"type": relation, "properties": {}},
-                    "tail": {
-                        "label": label,
-                        "id": str(hash(tail)),
-                        "properties": {"name": tail},
-                    },
+                    "tail": node_for(tail),
                 }
-            )
+                for head, relation, tail in (
+                    self.triples if triples is None else triples
+                )
+            ]
+        }
         return graph
 
+    def iter_triples(self) -> Iterator[tuple[str, str, str]]:
+        """
+        按 parse_all 的顺序逐个生成所有图的三元组，不写入 self.triples
+        """
+        yield from self.iter_requirement_triples()
+        yield from self.iter_internal_block_triples()
+        yield from self.iter_block_triples()
+        yield from self.iter_usecase_triples()
+        yield from self.iter_activity_triples()
+        yield from self.iter_class_triples()
+        yield from self.iter_state_machine_triples()
+        yield from self.iter_package_triples()
+        yield from self.iter_parametric_triples()
+
     def parse_all(self):
-        self.extract_requirement_diagrams()
-        self.extract_internal_block_diagrams()
-        self.extract_block_diagrams()
-        self.extract_usecase_diagrams()
-        self.extract_activity_diagrams()
-        self.extract_class_diagrams()
-        self.extract_state_machine_diagrams()
-        self.extract_package_diagrams()
-        self.extract_parametric_diagrams()
+        self.triples.extend(self.iter_triples())
         self.extract_tables()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(message)s",
+        handlers=[RichHandler(rich_tracebacks=True, show_time=False, markup=True)],
+    )
+
     # 请确保这里的路径是正确的
     file_path = "data/trufun.tmx"  # 假设这个文件包含了参数图信息
-    content = Path(file_path).read_text(encoding="utf-8")
-    parser = SysMLParser(content)
+    parser = SysMLParser(source=file_path)  # 由 iterparse 直接读取文件，不先解码成字符串
 
     if parser.root is not None:
         parser.parse_all()
 
     graph = parser.triples_to_graph_json()
     logger.info("📊 [bold green]已提取图数据结构（JSON格式）[/bold green]\n")
-    with open("data/trufun.json", "w") as f:
-        json.dump(graph, f, ensure_ascii=False, indent=4)
+    # orjson 直接输出 UTF-8 字节，一次写入文件
+    Path("data/trufun.json").write_bytes(
+        orjson.dumps(graph, option=orjson.OPT_INDENT_2)
+    )
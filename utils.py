@@ -1,15 +1,23 @@
+import asyncio
+import inspect
 import json
 import logging
 import os
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Any, Callable, Literal, Optional
 
 from dotenv import load_dotenv
 from fire import Fire  # type: ignore
-from langchain_litellm import ChatLiteLLM
+import orjson
 from rich.logging import RichHandler
 
-from chat import extract_requirement_triples, query_by_subgraphs
+from chat import (
+    extract_requirement_triples,
+    get_embeddings,
+    get_llm,
+    query_by_subgraphs,
+)
+from chat.triple import read_paragraphs
 from controller.graph import Neo4jGraphController
 from controller.tmx import SysMLParser
 
@@ -22,20 +30,38 @@ async def import_triples(triples_path: str):
         url=os.getenv("NEO4J_URL", "enter_your_neo4j_url_in_.env"),
         username=os.getenv("NEO4J_USER", "enter_your_neo4j_username_in_.env"),
         password=os.getenv("NEO4J_PASSWORD", "enter_your_neo4j_password_in_.env"),
+        embeddings=get_embeddings(),
     )
+    await graph_controller.ensure_indexes()
     await graph_controller.import_triples(triples)
     print(f"✅ 成功导入三元组数据: {triples_path}")
 
 
+async def migrate():
+    """
+    迁移旧版本导入的数据：为缺少 :Entity 标签的节点补上标签，
+    配置了向量模型时为缺少名称向量的实体补齐向量。只需在升级后运行一次
+    """
+    graph_controller = Neo4jGraphController(
+        url=os.getenv("NEO4J_URL", "enter_your_neo4j_url_in_.env"),
+        username=os.getenv("NEO4J_USER", "enter_your_neo4j_username_in_.env"),
+        password=os.getenv("NEO4J_PASSWORD", "enter_your_neo4j_password_in_.env"),
+        embeddings=get_embeddings(),
+    )
+    await graph_controller.migrate_entity_labels()
+    await graph_controller.ensure_indexes()
+    await graph_controller.backfill_name_embeddings()
+    print("✅ 数据迁移完成")
+
+
 async def test_query():
     # 初始化 LLM
-    llm = ChatLiteLLM(
-        model="deepseek/deepseek-chat",
-    )
+    llm = get_llm()
     graph_controller = Neo4jGraphController(
         url=os.getenv("NEO4J_URL", "enter_your_neo4j_url_in_.env"),
         username=os.getenv("NEO4J_USER", "enter_your_neo4j_username_in_.env"),
         password=os.getenv("NEO4J_PASSWORD", "enter_your_neo4j_password_in_.env"),
+        embeddings=get_embeddings(),
     )
     questions = [
         "分析机内通话的需求",
@@ -45,33 +71,21 @@ async def test_query():
         await query_by_subgraphs(llm=llm, graph_controller=graph_controller, question=q)
 
 
-def extract_triples(input_txt_path: str, output_json_path: str):
-    with open(input_txt_path, "r", encoding="utf-8") as f:
-        content = f.read()
+async def extract_triples(input_txt_path: str, output_json_path: str):
+    paragraphs = await asyncio.to_thread(read_paragraphs, input_txt_path)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(message)s",
-        datefmt="[%X]",
-        handlers=[RichHandler(rich_tracebacks=True, show_time=False, markup=True)],
+    llm = get_llm(temperature=0.7)
+    result = await extract_requirement_triples(llm=llm, content=paragraphs)
+    Path(output_json_path).write_bytes(
+        orjson.dumps(result, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
     )
-    llm = ChatLiteLLM(
-        model="deepseek/deepseek-chat",
-        temperature=0.7,
-    )
-    result = extract_requirement_triples(llm=llm, content=content)
-    with open(output_json_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=4)
 
 
 def parse_tmx(input_tmx_path: str, output_json_path: str):
-    with open(input_tmx_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    parser = SysMLParser(content)
+    parser = SysMLParser(source=input_tmx_path)
     parser.parse_all()
     graph = parser.triples_to_graph_json()
-    with open(output_json_path, "w") as f:
-        json.dump(graph, f, ensure_ascii=False, indent=4)
+    Path(output_json_path).write_bytes(orjson.dumps(graph, option=orjson.OPT_INDENT_2))
     print(f"📊 已提取图数据结构（JSON格式）: {output_json_path}")
 
 
@@ -83,8 +97,20 @@ def check_path(path) -> bool:
     return True
 
 
+# 任务名 -> (任务函数, 必填参数)，由 tasks 按表分发
+TASKS: dict[str, tuple[Callable[..., Any], tuple[str, ...]]] = {
+    "import_triples": (import_triples, ("triples_path",)),
+    "test_query": (test_query, ()),
+    "extract_triples": (extract_triples, ("input_txt_path", "output_json_path")),
+    "parse_tmx": (parse_tmx, ("input_tmx_path", "output_json_path")),
+    "migrate": (migrate, ()),
+}
+
+
 async def tasks(
-    task: Literal["import_triples", "test_query", "extract_triples", "parse_tmx"],
+    task: Literal[
+        "import_triples", "test_query", "extract_triples", "parse_tmx", "migrate"
+    ],
     triples_path: Optional[str] = None,
     input_txt_path: Optional[str] = None,
     input_tmx_path: Optional[str] = None,
@@ -96,6 +122,8 @@ async def tasks(
     - import_triples: 导入三元组数据到 Neo4j
     - test_query: 测试查询功能
     - extract_triples: 从文本中提取需求相关的三元组并保存为 JSON 文件
+    - parse_tmx: 解析 TMX 文件并保存图结构 JSON
+    - migrate: 迁移旧版本导入的数据（补上 :Entity 标签和名称向量）
     Args:
         task (str): 任务名称
         triples_path (str, optional): 三元组文件路径，仅在 task 为 import_triples 时需要
@@ -103,26 +131,31 @@ async def tasks(
         output_json_path (str, optional): 输出 JSON 文件路径，在 task 为 extract_triples 和 parse_tmx 时需要
         input_tmx_path (str, optional): 输入 TMX 文件路径，仅在 task 为 parse_tmx 时需要
     """
-    if task not in ["import_triples", "test_query", "extract_triples", "parse_tmx"]:
-        raise ValueError(
-            f"未知任务: {task}. 可用任务: import_triples, test_query, extract_triples"
-        )
-    if task == "import_triples":
-        if triples_path is None:
-            raise ValueError("参数 triples_path 不能为空")
-        await import_triples(triples_path)
-    elif task == "test_query":
-        await test_query()
-    elif task == "extract_triples":
-        if input_txt_path is None or output_json_path is None:
-            raise ValueError("参数 input_txt_path 和 output_json_path 不能为空")
-        extract_triples(input_txt_path, output_json_path)
-    elif task == "parse_tmx":
-        if input_tmx_path is None or output_json_path is None:
-            raise ValueError("参数 input_tmx_path 和 output_json_path 不能为空")
-        parse_tmx(input_tmx_path, output_json_path)
+    if task not in TASKS:
+        raise ValueError(f"未知任务: {task}. 可用任务: {', '.join(TASKS)}")
+    func, required = TASKS[task]
+    arguments = {
+        "triples_path": triples_path,
+        "input_txt_path": input_txt_path,
+        "input_tmx_path": input_tmx_path,
+        "output_json_path": output_json_path,
+    }
+    kwargs = {name: arguments[name] for name in required}
+    if any(value is None for value in kwargs.values()):
+        raise ValueError(f"参数 {' 和 '.join(required)} 不能为空")
+
+    result = func(**kwargs)
+    if inspect.isawaitable(result):
+        await result
 
 
 if __name__ == "__main__":
     load_dotenv()
+    # 命令行入口统一配置一次日志，各任务函数中不再重复配置
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(rich_tracebacks=True, show_time=False, markup=True)],
+    )
     Fire(tasks)
@@ -1,17 +1,26 @@
-import json
+import asyncio
+import io
 import logging
 import os
 from contextlib import asynccontextmanager
-from typing import LiteralString, Optional
+from typing import IO, AsyncIterator, LiteralString, Optional
 
+import orjson
 from dotenv import load_dotenv
 from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from langchain_litellm import ChatLiteLLM
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from rich.logging import RichHandler
 
-from chat import extract_requirement_triples, query_by_subgraphs
+from chat import (
+    extract_requirement_triples,
+    get_embeddings,
+    get_llm,
+    query_by_subgraphs,
+    stream_query_by_subgraphs,
+)
+from chat.triple import split_paragraphs
 from controller.graph import Neo4jGraphController
 from controller.tmx import SysMLParser
 
@@ -28,9 +37,7 @@ logging.basicConfig(
 )
 
 # 模型配置
-llm = ChatLiteLLM(
-    model="deepseek/deepseek-chat",
-)
+llm = get_llm()
 
 
 # 初始化 Graph Controller
@@ -45,6 +52,7 @@ graph_controller = Neo4jGraphController(
     url=get_env_or_raise("NEO4J_URL"),
     username=get_env_or_raise("NEO4J_USER"),
     password=get_env_or_raise("NEO4J_PASSWORD"),
+    embeddings=get_embeddings(),
 )
 
 
@@ -59,7 +67,10 @@ async def lifespan(app: FastAPI):
     logger.info("Neo4j 连接已关闭")
 
 
-app = FastAPI(title="Triple Graph API", lifespan=lifespan)
+# 图结构等较大的响应体由 orjson 序列化
+app = FastAPI(
+    title="Triple Graph API", lifespan=lifespan, default_response_class=ORJSONResponse
+)
 
 
 app.add_middleware(
@@ -81,16 +92,21 @@ class CypherRequest(BaseModel):
     token: str
 
 
+def read_upload_paragraphs(source: IO[bytes]) -> list[str]:
+    """
+    逐行解码上传的文本并分段，不先把整个文件读入内存再解码成字符串
+    """
+    return split_paragraphs(io.TextIOWrapper(source, encoding="utf-8"))
+
+
 @app.post("/extract_triples")
 async def extract_triples_api(file: UploadFile = File(...)):
     """
     上传一段需求文本，提取三元组并返回 JSON
     """
     try:
-        content = await file.read()
-        result = await extract_requirement_triples(
-            llm=llm, content=content.decode("utf-8")
-        )
+        paragraphs = await asyncio.to_thread(read_upload_paragraphs, file.file)
+        result = await extract_requirement_triples(llm=llm, content=paragraphs)
         return {"triples": result}
     except Exception as e:
         logger.error(f"提取三元组失败,报错: {e}", exc_info=True)
@@ -107,7 +123,8 @@ async def import_triples_api(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="请上传 .json 格式文件")
     try:
         content = await file.read()
-        triples = json.loads(content)
+        # 较大的三元组文件解析耗时明显，放到工作线程中，避免阻塞事件循环
+        triples = await asyncio.to_thread(orjson.loads, content)
         await graph_controller.import_triples(triples=triples)
     except Exception as e:
         logger.error(f"导入三元组失败,报错: {e}", exc_info=True)
@@ -115,16 +132,24 @@ async def import_triples_api(file: UploadFile = File(...)):
     return {"message": "三元组导入成功"}
 
 
+def parse_tmx_graph(source: IO[bytes]) -> dict:
+    """
+    解析 TMX 并生成图结构 JSON，纯同步的 CPU 密集任务，由接口放到工作线程中执行
+    """
+    parser = SysMLParser(source=source)
+    parser.parse_all()
+    return parser.triples_to_graph_json()
+
+
 @app.post("/parse_tmx")
 async def parse_tmx_api(file: UploadFile = File(...)):
     """
     上传一个 TMX 文件，提取图结构 JSON
     """
-    content = await file.read()
     try:
-        parser = SysMLParser(content.decode("utf-8"))
-        parser.parse_all()
-        graph = parser.triples_to_graph_json()
+        # 上传内容已由 FastAPI 缓存在临时文件中，直接交给 iterparse 边读边解析，
+        # 不再整体读入内存并解码为字符串；解析在工作线程中进行，不阻塞事件循环
+        graph = await asyncio.to_thread(parse_tmx_graph, file.file)
     except Exception as e:
         logger.error(f"解析 TMX 文件失败,报错: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"解析失败: {str(e)}")
@@ -149,6 +174,39 @@ async def query_api(request: QueryRequest):
     }
 
 
+def sse_event(data: str, event: Optional[str] = None) -> str:
+    """
+    编码一条 Server-Sent Events 消息，多行内容拆成多个 data 字段
+    """
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in data.split("\n"))
+    return "\n".join(lines) + "\n\n"
+
+
+@app.post("/query/stream")
+async def query_stream_api(request: QueryRequest):
+    """
+    与 /query 相同，但以 Server-Sent Events 逐段返回 LLM 生成的回答
+    """
+
+    async def answer_events() -> AsyncIterator[str]:
+        answered = False
+        try:
+            async for content in stream_query_by_subgraphs(
+                llm=llm, graph_controller=graph_controller, question=request.question
+            ):
+                answered = True
+                yield sse_event(content)
+        except Exception as e:
+            # 响应头已发出，无法再返回 500，改为发送 error 事件
+            logger.error(f"查询失败,报错: {e}", exc_info=True)
+            yield sse_event(f"查询失败: {str(e)}", event="error")
+            return
+        yield sse_event("查询成功" if answered else "未找到相关内容", event="done")
+
+    return StreamingResponse(answer_events(), media_type="text/event-stream")
+
+
 @app.post("/cypher")
 async def cypher_api(request: CypherRequest):
     """